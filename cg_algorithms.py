@@ -4,6 +4,10 @@
 # 本文件只允许依赖math库
 import math
 
+# DDA和Naive向零取整，端点处的浮点误差可使像素超出两端点包围盒的距离（像素）；
+# 按控制点的包围盒剔除、分块或判断是否需要裁剪时，须把包围盒或窗口放宽这一距离
+LINE_MARGIN = 1
+
 
 def draw_line(p_list, algorithm):
     """绘制线段
@@ -80,20 +84,131 @@ def draw_line(p_list, algorithm):
     return result
 
 
-def draw_polygon(p_list, algorithm):
+def draw_lines(segments, algorithm, window=None):
+    """批量绘制线段
+
+    :param segments: (list of list of list of int: [[[x0, y0], [x1, y1]], ...]) 各线段的起点和终点坐标
+    :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'
+    :param window: (tuple of int: (x_min, y_min, x_max, y_max)) 只保留落在该闭区间内的像素，None表示不裁剪
+    :return: (list of list of int, list of int) 所有线段的像素点坐标首尾相接组成的列表，
+        以及第i条线段像素所在区间[offsets[i], offsets[i + 1])
+    """
+    result = []
+    offsets = [0]
+    if window is not None:
+        margin = widen(window, LINE_MARGIN)
+    for p_list in segments:
+        if window is None:
+            result += draw_line(p_list, algorithm)
+        elif overlaps(p_list, margin):
+            result += crop(draw_line(p_list, algorithm), window)
+        offsets.append(len(result))
+    return result, offsets
+
+
+def widen(window, margin):
+    """把窗口(x_min, y_min, x_max, y_max)四周各放宽margin个像素，margin为负时收缩"""
+    x_min, y_min, x_max, y_max = window
+    return x_min - margin, y_min - margin, x_max + margin, y_max + margin
+
+
+def overlaps(p_list, window):
+    """p_list的包围盒是否与窗口(x_min, y_min, x_max, y_max)相交"""
+    x_min, y_min, x_max, y_max = window
+    return (min(p[0] for p in p_list) <= x_max and max(p[0] for p in p_list) >= x_min and
+            min(p[1] for p in p_list) <= y_max and max(p[1] for p in p_list) >= y_min)
+
+
+def crop(pixels, window):
+    """只保留落在窗口(x_min, y_min, x_max, y_max)闭区间内的像素"""
+    x_min, y_min, x_max, y_max = window
+    return [p for p in pixels if x_min <= p[0] <= x_max and y_min <= p[1] <= y_max]
+
+
+def draw_polygon(p_list, algorithm, window=None):
     """绘制多边形
 
     :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 多边形的顶点坐标列表
-    :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'
+    :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'，'Scanline'表示按扫描线填充多边形内部
+    :param window: (tuple of int: (x_min, y_min, x_max, y_max)) 只保留落在该闭区间内的像素，None表示不裁剪
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
     """
-    result = []
-    for i in range(len(p_list) - 1):
-        line = draw_line([p_list[i], p_list[i + 1]], algorithm)
-        result += line
+    if algorithm == 'Scanline':
+        return [[x, y] for x0, x1, y in fill_polygon(p_list, window) for x in range(x0, x1 + 1)]
+    return draw_lines(polygon_edges(p_list), algorithm, window)[0]
+
+
+def fill_polygon(p_list, window=None):
+    """扫描线填充多边形（边表与活性边表，奇偶规则）
+
+    扫描线y与各边的交点按x排序后两两配对，区间内像素中心x满足x_left <= x <= x_right的像素被填充；
+    每条边只在y_min <= y < y_max的扫描线上计数，使共享顶点只计一次、水平边不参与
+    交点用整数分子num / dy表示，逐行加dx递推，不累积浮点误差
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 多边形的顶点坐标列表，首尾顶点自动相连
+    :param window: (tuple of int: (x_min, y_min, x_max, y_max)) 只生成落在该闭区间内的部分，None表示不裁剪
+    :return: (list of tuple of int: [(x_start, x_end, y), ...]) 按y递增排列的水平区间，每个区间包含两端点
+    """
+    # 边表：按下端点y排序的[y_min, y_max, num, dx, dy]，交点x = num / dy
+    edges = []
+    n = len(p_list)
+    for i in range(n):
+        (x0, y0), (x1, y1) = p_list[i], p_list[(i + 1) % n]
+        if y0 == y1:
+            continue
+        if y0 > y1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        edges.append([y0, y1, x0 * (y1 - y0), x1 - x0, y1 - y0])
+    if not edges:
+        return []
+    edges.sort(key=lambda e: e[0])
+    y = edges[0][0]
+    y_end = max(e[1] for e in edges) - 1
+    if window is not None:
+        x_lo, y_lo, x_hi, y_hi = window
+        y = max(y, y_lo)
+        y_end = min(y_end, y_hi)
+    spans = []
+    active = []
+    k = 0
+    while y <= y_end:
+        # 新的活性边，窗口下方跳过的扫描线直接算出交点
+        while k < len(edges) and edges[k][0] <= y:
+            e = edges[k]
+            if e[1] > y:
+                active.append([e[1], e[2] + (y - e[0]) * e[3], e[3], e[4]])
+            k += 1
+        active = [e for e in active if e[0] > y]
+        if not active:  # 下一条边的起点之前没有交点
+            if k == len(edges):
+                break
+            y = edges[k][0]
+            continue
+        active.sort(key=lambda e: e[1] / e[3])
+        last = None  # 本行上一个区间的右端，自相交多边形的相邻区间可能在整数交点处相接
+        for i in range(0, len(active) - 1, 2):
+            left, right = active[i], active[i + 1]
+            x0 = -(-left[1] // left[3])  # ceil
+            x1 = right[1] // right[3]    # floor
+            if window is not None:
+                x0, x1 = max(x0, x_lo), min(x1, x_hi)
+            if last is not None and x0 <= last:
+                x0 = last + 1
+            if x0 <= x1:
+                spans.append((x0, x1, y))
+                last = x1
+        for e in active:
+            e[1] += e[2]
+        y += 1
+    return spans
+
+
+def polygon_edges(p_list):
+    """多边形的各条边；最后一个顶点与第一个顶点相距不超过8时再补上闭合边"""
+    edges = [[p_list[i], p_list[i + 1]] for i in range(len(p_list) - 1)]
     if ((p_list[-1][0] - p_list[0][0]) ** 2 + (p_list[-1][1] - p_list[0][1]) ** 2) <= 64:
-        result += draw_line([p_list[-1], p_list[0]], algorithm)
-    return result
+        edges.append([p_list[-1], p_list[0]])
+    return edges
 
 
 def draw_circle(p_list, algorithm):
@@ -102,38 +217,31 @@ def draw_circle(p_list, algorithm):
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
     """
     x0, y0 = p_list[0]
-    r = p_list[1][1]  # int
-    p = 5/4 - r
-    result = []
+    xs, ys = _circle_octant(p_list[1][1])
+    # 关于y=x、x轴、y轴依次对称
+    return _symmetric(x0, y0, xs, ys, ((1, 1, False), (1, 1, True), (1, -1, False), (1, -1, True),
+                                       (-1, 1, False), (-1, 1, True), (-1, -1, False), (-1, -1, True)))
+
+
+def _circle_octant(r):
+    """中点圆算法从(0, r)到y = x附近的八分之一圆弧，返回x坐标列表和y坐标列表
+
+    原判别式5/4 - r的增量都是整数，其符号与1 - r加上相同增量的符号一致，故全程用整数
+    """
+    xs, ys = [], []
+    p = 1 - r
     yk = r
     for x in range(0, r):
         if x > yk:
             break
-        result.append([x, yk])
+        xs.append(x)
+        ys.append(yk)
         if p < 0:
             p = p + 2*(x+1) + 1
         else:
             p = p + 2 * (x + 1) + 1 - 2 * (yk - 1)
             yk = yk - 1
-    # x,y取反，关于y=x对称
-    temp = []
-    for i in result:
-        temp += [[i[1],i[0]]]
-    result += temp
-    # y取反，关于x轴对称
-    temp = []
-    for i in result:
-        temp += [[i[0], -1 * i[1]]]
-    result += temp
-    # x取反，关于y轴对称
-    temp = []
-    for i in result:
-        temp += [[-1 * i[0], i[1]]]
-    result += temp
-    for i in range(len(result)):
-        result[i][0] += x0
-        result[i][1] += y0
-    return result
+    return xs, ys
 
 
 def draw_ellipse(p_list):
@@ -142,65 +250,249 @@ def draw_ellipse(p_list):
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
     """
     x0, y0 = p_list[0]
-    rx, ry = p_list[1]
+    xs, ys = _ellipse_quadrant(p_list[1][0], p_list[1][1])
+    # 关于x轴、y轴依次对称
+    return _symmetric(x0, y0, xs, ys, ((1, 1, False), (1, -1, False), (-1, 1, False), (-1, -1, False)))
+
+
+def _ellipse_quadrant(rx, ry):
+    """中点椭圆算法第一象限的弧，返回x坐标列表和y坐标列表
+
+    判别式整体乘以4，消去rx²/4和(x+1/2)²中的分数，全程用整数
+    """
+    rx2, ry2 = rx * rx, ry * ry
     # 区域一绘制（切线斜率小于1）
-    p1 = ry**2 - (rx**2)*ry + (rx**2)/4
-    result = []
+    p1 = 4*ry2 - 4*rx2*ry + rx2
+    xs, ys = [], []
     xk = 0
     yk = ry
     for x in range(0, rx):
-        if (ry**2)*x >= (rx**2)*yk:
+        if ry2*x >= rx2*yk:
             xk = x
             break
-        result.append([x, yk])
+        xs.append(x)
+        ys.append(yk)
         if p1 < 0:
-            p1 = p1 + 2*(ry**2)*(x+1) + (ry**2)
+            p1 = p1 + 8*ry2*(x+1) + 4*ry2
         else:
-            p1 = p1 + 2*(ry**2)*(x+1) + (ry**2) - 2*(rx**2)*(yk-1)
+            p1 = p1 + 8*ry2*(x+1) + 4*ry2 - 8*rx2*(yk-1)
             yk = yk - 1
     # 区域二绘制（切线斜率大于1）
-    p2 = (ry**2)*((xk+1/2)**2) + (rx**2)*((yk-1)**2) - (rx**2)*(ry**2)
+    p2 = ry2*(2*xk+1)**2 + 4*rx2*(yk-1)**2 - 4*rx2*ry2
     while yk > 0:
-        result.append([xk, yk])
+        xs.append(xk)
+        ys.append(yk)
         if p2 > 0:
-            p2 = p2 - 2*(rx**2)*(yk-1) + (rx**2)
+            p2 = p2 - 8*rx2*(yk-1) + 4*rx2
         else:
-            p2 = p2 - 2*(rx**2)*(yk-1) + (rx**2) + 2*(ry**2)*(xk+1)
+            p2 = p2 - 8*rx2*(yk-1) + 4*rx2 + 8*ry2*(xk+1)
             xk = xk + 1
         yk -= 1
-    result.append([rx, 0])
-    # y取反，关于x轴对称
-    temp = []
-    for i in result:
-        temp += [[i[0], -1 * i[1]]]
-    result += temp
-    # x取反，关于y轴对称
-    temp = []
-    for i in result:
-        temp += [[-1 * i[0], i[1]]]
-    result += temp
-    for i in range(len(result)):
-        result[i][0] += x0
-        result[i][1] += y0
+    xs.append(rx)
+    ys.append(0)
+    return xs, ys
+
+
+def _symmetric(x0, y0, xs, ys, reflections):
+    """由一段弧直接生成各对称位置上的像素并加上中心坐标，结果列表预先分配
+
+    :param reflections: (tuple of tuple: ((sx, sy, swap), ...)) 依次输出的对称变换，swap为True时先交换x和y
+    """
+    n = len(xs)
+    result = [None] * (n * len(reflections))
+    for i, (sx, sy, swap) in enumerate(reflections):
+        us, vs = (ys, xs) if swap else (xs, ys)
+        cx = [x0 + u for u in us] if sx > 0 else [x0 - u for u in us]
+        cy = [y0 + v for v in vs] if sy > 0 else [y0 - v for v in vs]
+        result[i * n:(i + 1) * n] = map(list, zip(cx, cy))
     return result
 
 
+CURVE_TOLERANCE = 0.5  # 曲线折线逼近的最大误差（像素）
+
+
 def draw_curve(p_list, algorithm):
     """绘制曲线
     :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 曲线的控制点坐标列表
     :param algorithm: (string) 绘制使用的算法，包括'Bezier'和'B-spline'（三次均匀B样条曲线，曲线不必经过首末控制点）
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
+
+    曲线按折线误差不超过CURVE_TOLERANCE采样，相邻采样点取整后用Bresenham算法连接，结果是连通的像素路径
     """
-    x0, y0 = p_list[0]
-    x1, y1 = p_list[1]
     result = []
     if algorithm == 'Bezier':
-        pass
-    elif algorithm == 'B_spline':
-        pass
+        if p_list:
+            _bezier(result, p_list)
+    elif algorithm in ('B-spline', 'B_spline'):
+        for i in range(len(p_list) - 3):  # 每段只依赖相邻的4个控制点，总耗时与控制点数量成线性关系
+            _b_spline_segment(result, p_list[i], p_list[i + 1], p_list[i + 2], p_list[i + 3])
     return result
 
 
+def _steps(m, tolerance=CURVE_TOLERANCE):
+    """二阶导数模长不超过m的参数曲线在[0, 1]上均匀取n段时，折线与曲线的距离不超过m / (8 * n * n)，返回满足误差的最小n"""
+    return max(1, math.ceil(math.sqrt(m / (8 * tolerance))))
+
+
+def _connect(result, x0, y0, x1, y1):
+    """把(x0, y0)到(x1, y1)的Bresenham线段像素追加到result，不含起点(x0, y0)"""
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    sx = 1 if x1 > x0 else -1
+    sy = 1 if y1 > y0 else -1
+    err = dx - dy
+    while x0 != x1 or y0 != y1:
+        e2 = 2 * err
+        if e2 > -dy:
+            err -= dy
+            x0 += sx
+        if e2 < dx:
+            err += dx
+            y0 += sy
+        result.append([x0, y0])
+
+
+def _bezier(result, p_list):
+    """绘制Bezier曲线
+
+    Wang公式给出的均匀步数不超过8(n+1)时直接均匀采样；否则先均匀分为n+1段，
+    再检查每段参数中点到弦的距离，超过CURVE_TOLERANCE时二分，区间不短于Wang公式的步长，
+    使控制点很多时采样点数由曲线实际的长度和弯曲程度决定
+    """
+    n = len(p_list) - 1
+    xs = [float(p[0]) for p in p_list]
+    ys = [float(p[1]) for p in p_list]
+    m = 0
+    for i in range(n - 1):  # Wang公式：二阶导数模长不超过n(n-1)乘以控制点二阶差分的最大模长
+        ddx = xs[i] - 2 * xs[i + 1] + xs[i + 2]
+        ddy = ys[i] - 2 * ys[i + 1] + ys[i + 2]
+        m = max(m, math.hypot(ddx, ddy))
+    steps = _steps(n * (n - 1) * m)
+    if n <= 1000:  # C(n, i) * 2^n仍在浮点数范围内
+        cx = [math.comb(n, i) * x for i, x in enumerate(xs)]
+        cy = [math.comb(n, i) * y for i, y in enumerate(ys)]
+        point = lambda t: _bezier_horner(cx, cy, t)
+    else:
+        log_comb = [math.lgamma(n + 1) - math.lgamma(i + 1) - math.lgamma(n - i + 1) for i in range(n + 1)]
+        point = lambda t: _bezier_log(xs, ys, log_comb, t)
+    px, py = p_list[0]
+    result.append([px, py])
+    if steps <= 8 * (n + 1):
+        for k in range(1, steps + 1):
+            x, y = point(k / steps)
+            x = int(round(x))
+            y = int(round(y))
+            _connect(result, px, py, x, y)
+            px, py = x, y
+        return
+    count = n + 1
+    stack = []
+    ax, ay = xs[0], ys[0]
+    for k in range(1, count + 1):
+        bx, by = point(k / count)
+        stack.append(((k - 1) / count, ax, ay, k / count, bx, by))
+        while stack:
+            t0, x0, y0, t1, x1, y1 = stack.pop()
+            if (t1 - t0) * steps > 1:
+                tm = (t0 + t1) / 2
+                xm, ym = point(tm)
+                dx = x1 - x0
+                dy = y1 - y0
+                chord = math.hypot(dx, dy)
+                if abs(dx * (ym - y0) - dy * (xm - x0)) > CURVE_TOLERANCE * chord or \
+                        math.hypot(xm - x0, ym - y0) > chord:  # 中点到弦的距离超过误差，或中点不在弦的范围内
+                    stack.append((tm, xm, ym, t1, x1, y1))
+                    stack.append((t0, x0, y0, tm, xm, ym))
+                    continue
+            x = int(round(x1))
+            y = int(round(y1))
+            _connect(result, px, py, x, y)
+            px, py = x, y
+        ax, ay = bx, by
+
+
+def _bezier_horner(cx, cy, t):
+    """cx、cy为C(n, i) * P_i；t <= 0.5时B(t) = (1-t)^n * Σ C(n, i) * P_i * s^i，s = t / (1-t) <= 1，
+    按Horner法则O(n)求和，t > 0.5时对称地交换首末两端
+    """
+    n = len(cx) - 1
+    u = 1 - t
+    if t <= 0.5:
+        s = t / u
+        x = cx[n]
+        y = cy[n]
+        for i in range(n - 1, -1, -1):
+            x = x * s + cx[i]
+            y = y * s + cy[i]
+        w = u ** n
+    else:
+        s = u / t
+        x = cx[0]
+        y = cy[0]
+        for i in range(1, n + 1):
+            x = x * s + cx[i]
+            y = y * s + cy[i]
+        w = t ** n
+    return x * w, y * w
+
+
+def _bezier_log(xs, ys, log_comb, t):
+    """在对数域中计算Bernstein基函数，用于二项式系数超出浮点数范围的高阶曲线，log_comb[i]为ln C(n, i)"""
+    if t <= 0 or t >= 1:
+        return (xs[0], ys[0]) if t <= 0 else (xs[-1], ys[-1])
+    n = len(xs) - 1
+    log_t = math.log(t)
+    log_u = math.log(1 - t)
+    x = y = 0.0
+    for i in range(n + 1):
+        b = math.exp(log_comb[i] + i * log_t + (n - i) * log_u)
+        x += b * xs[i]
+        y += b * ys[i]
+    return x, y
+
+
+def _b_spline_segment(result, p0, p1, p2, p3):
+    """用前向差分求三次均匀B样条的一段，每个采样点只需三次加法
+
+    该段为C(t) = a*t^3 + b*t^2 + c*t + d，t∈[0, 1]，
+    a = (-P0 + 3P1 - 3P2 + P3) / 6，b = (P0 - 2P1 + P2) / 2，c = (P2 - P0) / 2，d = (P0 + 4P1 + P2) / 6
+    """
+    ax = (-p0[0] + 3 * p1[0] - 3 * p2[0] + p3[0]) / 6
+    ay = (-p0[1] + 3 * p1[1] - 3 * p2[1] + p3[1]) / 6
+    bx = (p0[0] - 2 * p1[0] + p2[0]) / 2
+    by = (p0[1] - 2 * p1[1] + p2[1]) / 2
+    cx = (p2[0] - p0[0]) / 2
+    cy = (p2[1] - p0[1]) / 2
+    fx = (p0[0] + 4 * p1[0] + p2[0]) / 6
+    fy = (p0[1] + 4 * p1[1] + p2[1]) / 6
+    # C''(t) = 6a*t + 2b在两端点处取得最大模长
+    steps = _steps(max(math.hypot(2 * bx, 2 * by), math.hypot(6 * ax + 2 * bx, 6 * ay + 2 * by)))
+    h = 1 / steps
+    d3x = 6 * ax * h ** 3
+    d3y = 6 * ay * h ** 3
+    d2x = d3x + 2 * bx * h * h
+    d2y = d3y + 2 * by * h * h
+    d1x = ax * h ** 3 + bx * h * h + cx * h
+    d1y = ay * h ** 3 + by * h * h + cy * h
+    px = int(round(fx))
+    py = int(round(fy))
+    if not result:
+        result.append([px, py])
+    elif result[-1] != [px, py]:  # 与上一段的终点相同（只差舍入误差时用直线连接）
+        _connect(result, result[-1][0], result[-1][1], px, py)
+    for _ in range(steps):
+        fx += d1x
+        fy += d1y
+        d1x += d2x
+        d1y += d2y
+        d2x += d3x
+        d2y += d3y
+        x = int(round(fx))
+        y = int(round(fy))
+        _connect(result, px, py, x, y)
+        px, py = x, y
+
+
 def translate(p_list, dx, dy):
     """平移变换
 
@@ -225,7 +517,14 @@ def rotate(p_list, x, y, r):
     :param r: (int) 顺时针旋转角度（°）
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 变换后的图元参数
     """
-    pass
+    # 坐标系y轴向上，顺时针旋转r度即逆时针旋转-r度
+    theta = math.radians(r)
+    c, s = math.cos(theta), math.sin(theta)
+    result = []
+    for px, py in p_list:
+        dx, dy = px - x, py - y
+        result.append([round(x + dx * c + dy * s), round(y - dx * s + dy * c)])
+    return result
 
 
 def scale(p_list, x, y, s):
@@ -237,7 +536,53 @@ def scale(p_list, x, y, s):
     :param s: (float) 缩放倍数
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 变换后的图元参数
     """
-    pass
+    result = []
+    for px, py in p_list:
+        result.append([round(x + (px - x) * s), round(y + (py - y) * s)])
+    return result
+
+
+def translate_matrix(dx, dy):
+    """平移变换的3×3齐次坐标矩阵，作用于列向量[x, y, 1]"""
+    return [[1, 0, dx], [0, 1, dy], [0, 0, 1]]
+
+
+def rotate_matrix(x, y, r):
+    """绕(x, y)顺时针旋转r度的3×3矩阵，与rotate相同地以y轴向上为准"""
+    theta = math.radians(r)
+    c, s = math.cos(theta), math.sin(theta)
+    return [[c, s, x - c * x - s * y], [-s, c, y + s * x - c * y], [0, 0, 1]]
+
+
+def scale_matrix(x, y, s):
+    """以(x, y)为中心缩放s倍的3×3矩阵"""
+    return [[s, 0, x - s * x], [0, s, y - s * y], [0, 0, 1]]
+
+
+def compose(m2, m1):
+    """矩阵乘积m2·m1，即先做m1再做m2的变换"""
+    return [[sum(m2[i][k] * m1[k][j] for k in range(3)) for j in range(3)] for i in range(3)]
+
+
+def transform(p_list, m):
+    """对所有控制点应用仿射矩阵m，结果只在最后取整一次
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 图元参数
+    :param m: (list of list of number) 3×3仿射矩阵，见translate_matrix、rotate_matrix、scale_matrix和compose
+    :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 变换后的图元参数
+    """
+    (a, b, c), (d, e, f) = m[0], m[1]
+    return [[round(a * px + b * py + c), round(d * px + e * py + f)] for px, py in p_list]
+
+
+def transform_items(p_lists, matrices):
+    """批量变换多个图元，第i个图元的控制点应用matrices[i]
+
+    :param p_lists: (list of list of list of int) 各图元的参数
+    :param matrices: (list of list of list of number) 各图元的3×3仿射矩阵
+    :return: (list of list of list of int) 各图元变换后的参数
+    """
+    return [transform(p_list, m) for p_list, m in zip(p_lists, matrices)]
 
 
 def clip(p_list, x_min, y_min, x_max, y_max, algorithm):
@@ -249,6 +594,77 @@ def clip(p_list, x_min, y_min, x_max, y_max, algorithm):
     :param x_max: 裁剪窗口右下角x坐标
     :param y_max: 裁剪窗口右下角y坐标
     :param algorithm: (string) 使用的裁剪算法，包括'Cohen-Sutherland'和'Liang-Barsky'
-    :return: (list of list of int: [[x_0, y_0], [x_1, y_1]]) 裁剪后线段的起点和终点坐标
+    :return: (list of list of int: [[x_0, y_0], [x_1, y_1]]) 裁剪后线段的起点和终点坐标，线段完全在窗口外时返回[]
     """
-    pass
+    x_min, x_max = min(x_min, x_max), max(x_min, x_max)
+    y_min, y_max = min(y_min, y_max), max(y_min, y_max)
+    x0, y0 = p_list[0]
+    x1, y1 = p_list[1]
+    if algorithm == 'Cohen-Sutherland':
+        def encode(x, y):
+            code = 0
+            if x < x_min:
+                code |= 1  # 左
+            elif x > x_max:
+                code |= 2  # 右
+            if y < y_min:
+                code |= 4  # 下
+            elif y > y_max:
+                code |= 8  # 上
+            return code
+        code0, code1 = encode(x0, y0), encode(x1, y1)
+        while True:
+            if not (code0 | code1):  # 两端都在窗口内
+                break
+            if code0 & code1:  # 两端在窗口同一侧之外
+                return []
+            code = code0 if code0 else code1
+            if code & 1:
+                x, y = x_min, y0 + (y1 - y0) * (x_min - x0) / (x1 - x0)
+            elif code & 2:
+                x, y = x_max, y0 + (y1 - y0) * (x_max - x0) / (x1 - x0)
+            elif code & 4:
+                x, y = x0 + (x1 - x0) * (y_min - y0) / (y1 - y0), y_min
+            else:
+                x, y = x0 + (x1 - x0) * (y_max - y0) / (y1 - y0), y_max
+            if code == code0:
+                x0, y0 = x, y
+                code0 = encode(x0, y0)
+            else:
+                x1, y1 = x, y
+                code1 = encode(x1, y1)
+        return [[round(x0), round(y0)], [round(x1), round(y1)]]
+    elif algorithm == 'Liang-Barsky':
+        dx, dy = x1 - x0, y1 - y0
+        u0, u1 = 0, 1
+        for p, q in ((-dx, x0 - x_min), (dx, x_max - x0), (-dy, y0 - y_min), (dy, y_max - y0)):
+            if p == 0:
+                if q < 0:  # 平行于该边界且在窗口外
+                    return []
+            else:
+                u = q / p
+                if p < 0:
+                    u0 = max(u0, u)
+                else:
+                    u1 = min(u1, u)
+        if u0 > u1:
+            return []
+        return [[round(x0 + u0 * dx), round(y0 + u0 * dy)], [round(x0 + u1 * dx), round(y0 + u1 * dy)]]
+    return p_list
+
+
+def clip_lines(segments, x_min, y_min, x_max, y_max, algorithm):
+    """批量裁剪线段
+
+    :param segments: (list of list of list of int: [[[x0, y0], [x1, y1]], ...]) 各线段的起点和终点坐标
+    :param algorithm: (string) 使用的裁剪算法，包括'Cohen-Sutherland'和'Liang-Barsky'
+    :return: (list of list of list of int, list of bool) 各线段裁剪后的起点和终点坐标，以及是否保留该线段；
+        完全在窗口外的线段保留原坐标，对应的保留标记为False
+    """
+    result = []
+    keep = []
+    for p_list in segments:
+        clipped = clip(p_list, x_min, y_min, x_max, y_max, algorithm)
+        keep.append(bool(clipped))
+        result.append(clipped if clipped else [list(p_list[0]), list(p_list[1])])
+    return result, keep
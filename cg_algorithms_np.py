@@ -0,0 +1,461 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# cg_algorithms的NumPy向量化后端：接口与cg_algorithms一致，返回int32的(N, 2)像素坐标数组，
+# 像素结果与cg_algorithms逐点生成的结果完全一致（包括顺序）
+import numpy as np
+import cg_algorithms as alg
+
+
+def _as_array(pixels):
+    """把cg_algorithms返回的像素列表转为(N, 2)的int32数组"""
+    return np.asarray(pixels, dtype=np.int32).reshape(-1, 2)
+
+
+def _stack(xs, ys):
+    result = np.empty((len(xs), 2), np.int32)
+    result[:, 0] = xs
+    result[:, 1] = ys
+    return result
+
+
+def draw_line(p_list, algorithm):
+    """绘制线段
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1]]) 线段的起点和终点坐标
+    :param algorithm: (string) 绘制使用的算法，包括'Naive'、'DDA'和'Bresenham'
+    :return: (numpy.ndarray of int32, shape (N, 2)) 绘制结果的像素点坐标
+    """
+    x0, y0 = int(p_list[0][0]), int(p_list[0][1])
+    x1, y1 = int(p_list[1][0]), int(p_list[1][1])
+    if algorithm == 'Naive':
+        if x0 == x1:
+            ys = np.arange(y0, y1 + 1)
+            return _stack(np.full(len(ys), x0), ys)
+        if x0 > x1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        k = (y1 - y0) / (x1 - x0)
+        xs = np.arange(x0, x1 + 1)
+        return _stack(xs, np.trunc(y0 + k * (xs - x0)))
+    elif algorithm == 'DDA':
+        if x0 == x1:
+            y0, y1 = (y1, y0) if y0 > y1 else (y0, y1)
+            ys = np.arange(y0, y1 + 1)
+            return _stack(np.full(len(ys), x0), ys)
+        m = (y1 - y0) / (x1 - x0)
+        if abs(m) <= 1:
+            if x0 > x1:
+                x0, y0, x1, y1 = x1, y1, x0, y0
+            xs = np.arange(x0, x1 + 1)
+            return _stack(xs, np.trunc(y0 + m * (xs - x0)))
+        if y0 > y1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        ys = np.arange(y0, y1 + 1)
+        return _stack(np.trunc(x0 + (1 / m) * (ys - y0)), ys)
+    elif algorithm == 'Bresenham':
+        if x0 == x1:
+            y0, y1 = (y1, y0) if y0 > y1 else (y0, y1)
+            ys = np.arange(y0, y1 + 1)
+            return _stack(np.full(len(ys), x0), ys)
+        dx = abs(x1 - x0)
+        dy = abs(y1 - y0)
+        # 决策参数p_k = 2dy(k+1) - dx - 2dx*n_k，其中n_k为前k步的递增次数，
+        # 归纳可得n_k = floor((2dy*k + dx) / 2dx)，因此无需逐点迭代
+        if dy / dx <= 1:
+            if x0 > x1:
+                x0, y0, x1, y1 = x1, y1, x0, y0
+            t = 1 if y0 < y1 else -1
+            k = np.arange(dx + 1, dtype=np.int64)
+            return _stack(x0 + k, y0 + t * ((2 * dy * k + dx) // (2 * dx)))
+        if y0 > y1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        t = 1 if x0 < x1 else -1
+        k = np.arange(dy + 1, dtype=np.int64)
+        return _stack(x0 + t * ((2 * dx * k + dy) // (2 * dy)), y0 + k)
+    return np.empty((0, 2), np.int32)
+
+
+LINE_CHUNK = 1 << 20  # draw_lines每批处理的像素数，使中间数组留在缓存中
+
+
+def draw_lines(segments, algorithm, window=None):
+    """批量绘制线段，一次向量化计算所有线段的像素
+
+    :param segments: (array-like of int, shape (N, 2, 2)) N条线段的起点和终点坐标
+    :param algorithm: (string) 绘制使用的算法，包括'Naive'、'DDA'和'Bresenham'
+    :param window: (tuple of int: (x_min, y_min, x_max, y_max)) 只生成落在该闭区间内的像素，None表示不裁剪
+    :return: (numpy.ndarray of int32, shape (M, 2), numpy.ndarray of int64, shape (N + 1,))
+        所有线段像素点坐标首尾相接组成的数组，以及第i条线段像素所在区间[offsets[i], offsets[i + 1])
+
+    指定window时在光栅化之前把每条线段的步数范围裁剪到窗口内（主方向精确、副方向留2个像素的余量），
+    再去掉余量中的窗口外像素，结果与先完整绘制再去掉窗口外像素相同，耗时只与窗口内的长度有关
+    """
+    seg = np.asarray(segments, dtype=np.int64).reshape(-1, 2, 2)
+    n = len(seg)
+    x0, y0 = seg[:, 0, 0], seg[:, 0, 1]
+    x1, y1 = seg[:, 1, 0], seg[:, 1, 1]
+    vertical = x0 == x1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m = (y1 - y0) / (x1 - x0)
+    if algorithm == 'Naive':
+        x_major = ~vertical
+        swap = x_major & (x0 > x1)
+    elif algorithm in ('DDA', 'Bresenham'):
+        x_major = ~vertical & (np.abs(m) <= 1)
+        swap = np.where(x_major, x0 > x1, y0 > y1)
+    else:
+        return np.empty((0, 2), np.int32), np.zeros(n + 1, np.int64)
+    # 与draw_line相同地交换端点，使主方向上从起点递增到终点
+    sx, sy = np.where(swap, x1, x0), np.where(swap, y1, y0)
+    ex, ey = np.where(swap, x0, x1), np.where(swap, y0, y1)
+    main0 = np.where(x_major, sx, sy)
+    minor0 = np.where(x_major, sy, sx)
+    counts = np.maximum(np.where(x_major, ex - sx, ey - sy) + 1, 0)
+    # 副方向坐标：Bresenham为minor0 + t * ((a*k + b) // c)，DDA与Naive为trunc(minor0 + step * k)
+    if algorithm == 'Bresenham':
+        adx, ady = np.abs(ex - sx), np.abs(ey - sy)
+        t = np.where(x_major, np.where(sy < ey, 1, -1), np.where(sx < ex, 1, -1))
+        a = np.where(x_major, 2 * ady, 2 * adx)
+        b = np.where(x_major, adx, ady)
+        c = np.maximum(2 * b, 1)
+    else:
+        with np.errstate(divide='ignore'):
+            step = np.where(vertical, 0.0, np.where(x_major, m, 1 / m))
+    k0 = np.zeros(n, np.int64)  # 每条线段从第k0步开始生成
+    if window is not None:
+        x_lo, y_lo, x_hi, y_hi = window
+        main_lo, main_hi = np.where(x_major, x_lo, y_lo), np.where(x_major, x_hi, y_hi)
+        minor_lo, minor_hi = np.where(x_major, y_lo, x_lo), np.where(x_major, y_hi, x_hi)
+        k_lo = np.maximum(main_lo - main0, 0)
+        k_hi = np.minimum(main_hi - main0, counts - 1)
+        # 副方向坐标随k单调变化，与minor0 + slope * k相差不到1，按副方向放宽2个像素的范围解出步数
+        slope = t * a / c if algorithm == 'Bresenham' else step
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ka = (minor_lo - 2 - minor0) / slope
+            kb = (minor_hi + 2 - minor0) / slope
+        k_min = np.floor(np.minimum(ka, kb)) - 1
+        k_max = np.ceil(np.maximum(ka, kb)) + 1
+        # 副方向坐标不变的线段：副坐标在窗口内时不限制，否则没有像素
+        flat = slope == 0
+        inside = (minor_lo <= minor0) & (minor0 <= minor_hi)
+        k_min = np.where(flat, np.where(inside, -np.inf, np.inf), k_min)
+        k_max = np.where(flat, np.where(inside, np.inf, -np.inf), k_max)
+        k_lo = np.maximum(k_lo, k_min)
+        k_hi = np.minimum(k_hi, k_max)
+        counts = np.maximum(k_hi - k_lo + 1, 0).astype(np.int64)
+        k0 = np.where(counts > 0, k_lo, 0).astype(np.int64)
+    offsets = np.zeros(n + 1, np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    result = np.empty((offsets[-1], 2), np.int32)
+    kept = np.zeros(n, np.int64) if window is not None else None
+    out = 0
+    lo = 0
+    while lo < n:
+        # 按像素数分批，单条超长线段独占一批
+        hi = max(int(np.searchsorted(offsets, offsets[lo] + LINE_CHUNK, 'right')) - 1, lo + 1)
+        p0, p1 = offsets[lo], offsets[hi]
+        idx = np.repeat(np.arange(lo, hi), counts[lo:hi])
+        k = np.arange(p1 - p0, dtype=np.int64) - (offsets[idx] - p0) + k0[idx]
+        main = main0[idx] + k
+        if algorithm == 'Bresenham':
+            minor = minor0[idx] + t[idx] * ((a[idx] * k + b[idx]) // c[idx])
+        else:
+            minor = np.trunc(minor0[idx] + step[idx] * k)
+        major = x_major[idx]
+        xs = np.where(major, main, minor)
+        ys = np.where(major, minor, main)
+        if window is not None:  # 去掉副方向余量中的窗口外像素
+            mask = (x_lo <= xs) & (xs <= x_hi) & (y_lo <= ys) & (ys <= y_hi)
+            xs, ys = xs[mask], ys[mask]
+            kept[lo:hi] = np.bincount(idx[mask] - lo, minlength=hi - lo)
+        result[out:out + len(xs), 0] = xs
+        result[out:out + len(xs), 1] = ys
+        out += len(xs)
+        lo = hi
+    if window is not None:
+        result = result[:out]
+        offsets = np.zeros(n + 1, np.int64)
+        np.cumsum(kept, out=offsets[1:])
+    return result, offsets
+
+
+def transform_items(p_lists, matrices):
+    """批量变换多个图元：所有控制点拼接后一次向量化计算，结果与cg_algorithms.transform_items完全一致
+
+    :param p_lists: (list of list of list of int) 各图元的参数
+    :param matrices: (array-like of float, shape (N, 3, 3)) 各图元的3×3仿射矩阵
+    :return: (list of list of list of int) 各图元变换后的参数
+    """
+    if not len(p_lists):
+        return []
+    counts = [len(p_list) for p_list in p_lists]
+    points = np.array([p for p_list in p_lists for p in p_list], dtype=np.float64).reshape(-1, 2)
+    m = np.repeat(np.asarray(matrices, dtype=np.float64)[:, :2, :], counts, axis=0)
+    x, y = points[:, 0], points[:, 1]
+    # 与cg_algorithms.transform相同的运算顺序，保证浮点结果逐位相同；np.rint与round同为四舍六入五成双
+    result = np.empty((len(points), 2), np.int64)
+    result[:, 0] = np.rint(m[:, 0, 0] * x + m[:, 0, 1] * y + m[:, 0, 2])
+    result[:, 1] = np.rint(m[:, 1, 0] * x + m[:, 1, 1] * y + m[:, 1, 2])
+    result = result.tolist()
+    split = []
+    start = 0
+    for count in counts:
+        split.append(result[start:start + count])
+        start += count
+    return split
+
+
+def clip_lines(segments, x_min, y_min, x_max, y_max, algorithm):
+    """批量裁剪线段，所有线段同时向量化计算，结果与cg_algorithms.clip逐条裁剪完全一致
+
+    :param segments: (array-like of int, shape (N, 2, 2)) N条线段的起点和终点坐标
+    :param algorithm: (string) 使用的裁剪算法，包括'Cohen-Sutherland'和'Liang-Barsky'
+    :return: (numpy.ndarray of int64, shape (N, 2, 2), numpy.ndarray of bool, shape (N,))
+        各线段裁剪后的起点和终点坐标，以及是否保留该线段；完全在窗口外的线段保留原坐标，对应的保留标记为False
+    """
+    seg = np.asarray(segments, dtype=np.int64).reshape(-1, 2, 2)
+    x_min, x_max = min(x_min, x_max), max(x_min, x_max)
+    y_min, y_max = min(y_min, y_max), max(y_min, y_max)
+    x0, y0 = seg[:, 0, 0].astype(np.float64), seg[:, 0, 1].astype(np.float64)
+    x1, y1 = seg[:, 1, 0].astype(np.float64), seg[:, 1, 1].astype(np.float64)
+    if algorithm == 'Cohen-Sutherland':
+        def encode(x, y):
+            return (np.where(x < x_min, 1, np.where(x > x_max, 2, 0)) |
+                    np.where(y < y_min, 4, np.where(y > y_max, 8, 0)))
+        code0, code1 = encode(x0, y0), encode(x1, y1)
+        keep = np.ones(len(seg), bool)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            while True:
+                keep &= (code0 & code1) == 0
+                active = keep & ((code0 | code1) != 0)
+                if not active.any():
+                    break
+                # 每轮把每条未完成的线段的一个端点移到一条窗口边界上，与逐条裁剪的顺序相同
+                first = active & (code0 != 0)
+                code = np.where(first, code0, code1)
+                x = np.where(code & 3, np.where(code & 1, x_min, x_max), 0.0)
+                y = np.where(code & 3, 0.0, np.where(code & 4, y_min, y_max))
+                y = np.where(code & 3, y0 + (y1 - y0) * (x - x0) / (x1 - x0), y)
+                x = np.where(code & 3, x, x0 + (x1 - x0) * (y - y0) / (y1 - y0))
+                second = active & ~first
+                x0, y0 = np.where(first, x, x0), np.where(first, y, y0)
+                x1, y1 = np.where(second, x, x1), np.where(second, y, y1)
+                code0 = np.where(first, encode(x0, y0), code0)
+                code1 = np.where(second, encode(x1, y1), code1)
+    elif algorithm == 'Liang-Barsky':
+        dx, dy = x1 - x0, y1 - y0
+        u0 = np.zeros(len(seg))
+        u1 = np.ones(len(seg))
+        keep = np.ones(len(seg), bool)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for p, q in ((-dx, x0 - x_min), (dx, x_max - x0), (-dy, y0 - y_min), (dy, y_max - y0)):
+                keep &= (p != 0) | (q >= 0)  # 平行于该边界且在窗口外
+                u = q / p
+                u0 = np.where(p < 0, np.maximum(u0, u), u0)
+                u1 = np.where(p > 0, np.minimum(u1, u), u1)
+        keep &= u0 <= u1
+        x0, y0, x1, y1 = x0 + u0 * dx, y0 + u0 * dy, x0 + u1 * dx, y0 + u1 * dy
+    else:
+        return seg, np.ones(len(seg), bool)
+    result = np.rint(np.stack([x0, y0, x1, y1], axis=1)).astype(np.int64).reshape(-1, 2, 2)
+    result[~keep] = seg[~keep]
+    return result, keep
+
+
+def draw_polygon(p_list, algorithm, window=None):
+    """绘制多边形，各条边合并为一次draw_lines
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 多边形的顶点坐标列表
+    :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'，'Scanline'表示按扫描线填充多边形内部
+    :param window: (tuple of int: (x_min, y_min, x_max, y_max)) 只生成落在该闭区间内的像素，None表示不裁剪
+    :return: (numpy.ndarray of int32, shape (N, 2)) 绘制结果的像素点坐标
+    """
+    if algorithm == 'Scanline':
+        return spans_to_pixels(fill_polygon(p_list, window))
+    return draw_lines(alg.polygon_edges(p_list), algorithm, window)[0]
+
+
+def fill_polygon(p_list, window=None):
+    """扫描线填充多边形，见cg_algorithms.fill_polygon
+
+    :return: (numpy.ndarray of int64, shape (S, 3)) 每行为一个水平区间(x_start, x_end, y)
+    """
+    return np.array(alg.fill_polygon(p_list, window), dtype=np.int64).reshape(-1, 3)
+
+
+def spans_to_pixels(spans):
+    """把水平区间(x_start, x_end, y)展开为按区间顺序排列的像素坐标"""
+    spans = np.asarray(spans, dtype=np.int64).reshape(-1, 3)
+    counts = spans[:, 1] - spans[:, 0] + 1
+    starts = np.cumsum(counts) - counts
+    idx = np.repeat(np.arange(len(spans)), counts)
+    result = np.empty((len(idx), 2), np.int32)
+    result[:, 0] = spans[idx, 0] + np.arange(len(idx)) - starts[idx]
+    result[:, 1] = spans[idx, 2]
+    return result
+
+
+def overlaps(p_list, window):
+    """p_list的包围盒是否与窗口(x_min, y_min, x_max, y_max)相交"""
+    return alg.overlaps(p_list, window)
+
+
+def crop(pixels, window):
+    """只保留落在窗口(x_min, y_min, x_max, y_max)闭区间内的像素"""
+    x_min, y_min, x_max, y_max = window
+    x, y = pixels[:, 0], pixels[:, 1]
+    return pixels[(x_min <= x) & (x <= x_max) & (y_min <= y) & (y <= y_max)]
+
+
+MIDPOINT_LIMIT = 1 << 30  # 判别式的量级约为4rx²ry²，rx·ry达到该值时int64会溢出，改用cg_algorithms逐点计算
+
+
+def _midpoint_rows(rx, ry, n):
+    """中点算法区域一（切线斜率小于1）中x = 0..n-1处的y坐标
+
+    中点算法在x+1处保持y不变当且仅当 4ry²(x+1)² + rx²(2y-1)² < 4rx²ry²，
+    记满足该式的最大y为Y(x+1)，则y_{x+1} = max(Y(x+1), y_x - 1)，可用累积最大值一次求出
+    """
+    xs = np.arange(n, dtype=np.int64)
+    rx2, ry2 = rx * rx, ry * ry
+    rhs = 4 * ry2 * (rx2 - xs * xs)  # 比较式两边同除以rx²前的右端
+
+    def inside(y):
+        return (y >= 1) & (rx2 * (2 * y - 1) ** 2 < rhs)
+
+    with np.errstate(invalid='ignore'):
+        est = np.floor(0.5 + ry * np.sqrt(np.maximum(rx2 - xs * xs, 0)) / max(rx, 1))
+    ys = np.maximum(est.astype(np.int64), 0)
+    # 修正浮点估计的误差，使ys恰为满足整数不等式的最大值
+    while True:
+        down = (ys > 0) & ~inside(ys)
+        if not down.any():
+            break
+        ys[down] -= 1
+    while True:
+        up = inside(ys + 1)
+        if not up.any():
+            break
+        ys[up] += 1
+    if n:
+        ys[0] = ry
+    return np.maximum.accumulate(ys + xs) - xs
+
+
+def draw_circle(p_list, algorithm):
+    """绘制圆（采用中点圆生成算法）
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1]]) 圆的圆心坐标和半径[0,r]
+    :return: (numpy.ndarray of int32, shape (N, 2)) 绘制结果的像素点坐标
+    """
+    xs, ys = _circle_octant(int(p_list[1][1]))
+    # 与cg_algorithms.draw_circle相同的对称顺序：y=x、x轴、y轴
+    return _symmetric(int(p_list[0][0]), int(p_list[0][1]), xs, ys,
+                      ((1, 1, False), (1, 1, True), (1, -1, False), (1, -1, True),
+                       (-1, 1, False), (-1, 1, True), (-1, -1, False), (-1, -1, True)))
+
+
+def _circle_octant(r):
+    """中点圆算法从(0, r)到y = x附近的八分之一圆弧，返回int64的x坐标数组和y坐标数组"""
+    if r <= 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    if r * r >= MIDPOINT_LIMIT:
+        return tuple(np.array(a, np.int64) for a in alg._circle_octant(r))
+    ys = _midpoint_rows(r, r, r)
+    xs = np.arange(r, dtype=np.int64)
+    stop = np.flatnonzero(xs > ys)
+    n = stop[0] if len(stop) else r
+    return xs[:n], ys[:n]
+
+
+def draw_ellipse(p_list):
+    """绘制椭圆（采用中点圆生成算法）
+    :param p_list: (list of list of int: [[x0, y0], [a, b]]) 椭圆的中心点和长短半轴
+    :return: (numpy.ndarray of int32, shape (N, 2)) 绘制结果的像素点坐标
+    """
+    xs, ys = _ellipse_quadrant(int(p_list[1][0]), int(p_list[1][1]))
+    # 与cg_algorithms.draw_ellipse相同的对称顺序：x轴、y轴
+    return _symmetric(int(p_list[0][0]), int(p_list[0][1]), xs, ys,
+                      ((1, 1, False), (1, -1, False), (-1, 1, False), (-1, -1, False)))
+
+
+def _ellipse_quadrant(rx, ry):
+    """中点椭圆算法第一象限的弧，返回int64的x坐标数组和y坐标数组"""
+    if rx * ry >= MIDPOINT_LIMIT:
+        return tuple(np.array(a, np.int64) for a in alg._ellipse_quadrant(rx, ry))
+    rx2, ry2 = rx * rx, ry * ry
+    # 区域一（切线斜率小于1）
+    xk, yk = 0, ry
+    region1 = np.empty((0, 2), np.int64)
+    if rx > 0:
+        ys = _midpoint_rows(rx, ry, rx + 1)
+        xs = np.arange(rx + 1, dtype=np.int64)
+        stop = np.flatnonzero(ry2 * xs[:rx] >= rx2 * ys[:rx])
+        if len(stop):
+            n = stop[0]
+            xk, yk = int(n), int(ys[n])
+        else:
+            # 区域一未中断时，区域二从x = 0开始（与cg_algorithms.draw_ellipse一致）
+            n = rx
+            yk = int(ys[rx])
+        region1 = np.stack([xs[:n], ys[:n]], axis=1)
+    # 区域二（切线斜率大于1）：x在y-1处递增当且仅当 ry²(2x+1)² + 4rx²(y-1)² <= 4rx²ry²，
+    # 记满足该式的最大x+1为c(y-1)，则x_j = min(x_{j-1} + 1, max(c_j, xk))，可用累积最小值求出
+    region2 = np.empty((0, 2), np.int64)
+    if yk > 0:
+        rows = np.arange(yk, 0, -1, dtype=np.int64)  # 区域二依次输出的y
+        nxt = rows - 1
+        rhs = 4 * rx2 * (ry2 - nxt * nxt)
+
+        def fits(m):
+            return (m >= 1) & (ry2 * (2 * m - 1) ** 2 <= rhs)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            est = np.floor(0.5 + rx * np.sqrt(np.maximum(ry2 - nxt * nxt, 0)) / max(ry, 1))
+        c = np.maximum(est.astype(np.int64), 0)
+        while True:
+            down = (c > 0) & ~fits(c)
+            if not down.any():
+                break
+            c[down] -= 1
+        while True:
+            up = fits(c + 1)
+            if not up.any():
+                break
+            c[up] += 1
+        c = np.maximum(c, xk)
+        j = np.arange(1, len(rows) + 1, dtype=np.int64)
+        x_next = j + np.minimum(xk, np.minimum.accumulate(c - j))
+        xs = np.concatenate([[xk], x_next[:-1]])
+        region2 = np.stack([xs, rows], axis=1)
+    return (np.concatenate([region1[:, 0], region2[:, 0], [rx]]).astype(np.int64),
+            np.concatenate([region1[:, 1], region2[:, 1], [0]]).astype(np.int64))
+
+
+def _symmetric(x0, y0, xs, ys, reflections):
+    """由一段弧直接写出各对称位置上的像素，结果数组预先分配，中心坐标在同一次写入中加上
+
+    :param reflections: (tuple of tuple: ((sx, sy, swap), ...)) 依次输出的对称变换，swap为True时先交换x和y
+    """
+    n = len(xs)
+    result = np.empty((n * len(reflections), 2), np.int32)
+    for i, (sx, sy, swap) in enumerate(reflections):
+        us, vs = (ys, xs) if swap else (xs, ys)
+        block = result[i * n:(i + 1) * n]
+        if sx > 0:
+            np.add(us, x0, out=block[:, 0], casting='unsafe')
+        else:
+            np.subtract(x0, us, out=block[:, 0], casting='unsafe')
+        if sy > 0:
+            np.add(vs, y0, out=block[:, 1], casting='unsafe')
+        else:
+            np.subtract(y0, vs, out=block[:, 1], casting='unsafe')
+    return result
+
+
+def draw_curve(p_list, algorithm):
+    """绘制曲线
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 曲线的控制点坐标列表
+    :param algorithm: (string) 绘制使用的算法，包括'Bezier'和'B-spline'
+    :return: (numpy.ndarray of int32, shape (N, 2)) 绘制结果的像素点坐标
+    """
+    return _as_array(alg.draw_curve(p_list, algorithm))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 批量执行命令文件：把一个目录或任务清单中的命令文件分发到进程池中执行，每个工作进程只导入一次cg_cli和绘制后端，
+# 逐个输出完成进度，最后写出各文件的耗时和失败原因汇总
+import io
+import os
+import sys
+import csv
+import time
+import shlex
+import argparse
+import traceback
+import cg_cli
+
+_parser = None  # 工作进程内复用的cg_cli命令行解析器
+
+
+def run_task(argv):
+    """在工作进程中执行一个任务，不抛出异常
+
+    :param argv: (list of string) cg_cli的命令行参数
+    :return: (tuple: (string, float, string)) 状态'ok'或'error'、耗时（秒）、--timing的统计或失败原因
+    """
+    global _parser
+    if _parser is None:
+        _parser = cg_cli.build_parser()
+    start = time.perf_counter()
+    out = io.StringIO()
+    try:
+        cg_cli.run_job(cg_cli.parse_task(_parser, argv), out)
+    except Exception as e:
+        detail = traceback.format_exception_only(type(e), e)[-1].strip()
+        return 'error', time.perf_counter() - start, detail
+    return 'ok', time.perf_counter() - start, out.getvalue()
+
+
+def collect_tasks(source, output_root, options, pattern='.txt'):
+    """列出source中的任务，返回[(名称, argv), ...]
+
+    source为目录时，其中（含子目录）所有以pattern结尾的文件各为一个任务，输出到output_root下同名（去掉扩展名）的目录；
+    否则source为任务清单，每个非空且不以#开头的行为一个任务的cg_cli命令行参数（与cg_cli --serve的任务格式相同），
+    以命令文件命名，同一命令文件出现多次时依次加上#2、#3等后缀。options附加在每个任务的参数之后
+    """
+    tasks = []
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(pattern):
+                    path = os.path.join(root, name)
+                    rel = os.path.splitext(os.path.relpath(path, source))[0]
+                    tasks.append((rel, [path, os.path.join(output_root, rel)] + options))
+        return tasks
+    seen = {}
+    with open(source, 'r') as fp:
+        for line in fp:
+            argv = shlex.split(line, comments=True)
+            if argv:
+                seen[argv[0]] = seen.get(argv[0], 0) + 1
+                name = argv[0] if seen[argv[0]] == 1 else '%s#%d' % (argv[0], seen[argv[0]])
+                tasks.append((name, argv + options))
+    return tasks
+
+
+def write_summary(path, names, results):
+    """把各任务的结果按任务顺序写成CSV：name, status, seconds, error"""
+    with open(path, 'w', newline='') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(['name', 'status', 'seconds', 'error'])
+        for name, (status, elapsed, detail) in zip(names, results):
+            writer.writerow([name, status, '%.4f' % elapsed, detail if status == 'error' else ''])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='用进程池批量执行命令文件；--之后的参数（如-- --backend numpy）原样传给每个任务的cg_cli',
+        usage='%(prog)s [-h] [-w WORKERS] [--pattern PATTERN] [--summary SUMMARY] [-q] '
+              'source output_root [-- cg_cli选项 ...]')
+    parser.add_argument('source', help='命令文件所在目录，或每行一个任务的清单文件（格式同cg_cli --serve）')
+    parser.add_argument('output_root', help='目录模式下各命令文件的输出目录的上级目录，汇总文件也写在这里')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='工作进程数，默认为CPU核数（与各任务cg_cli的--jobs无关）')
+    parser.add_argument('--pattern', default='.txt', help='目录模式下命令文件的扩展名')
+    parser.add_argument('--summary', help='汇总CSV的路径，默认为output_root/batch_summary.csv')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不逐个输出完成进度')
+    argv = sys.argv[1:] if argv is None else list(argv)
+    options = []
+    if '--' in argv:
+        argv, options = argv[:argv.index('--')], argv[argv.index('--') + 1:]
+    args = parser.parse_args(argv)
+    cli_parser = cg_cli.build_parser()
+    cli_parser.prog = 'cg_cli'
+    try:  # 在分发任务之前检查传给cg_cli的选项
+        cg_cli.parse_task(cli_parser, ['input', 'output'] + options)
+    except ValueError as e:
+        parser.error(str(e))
+
+    tasks = collect_tasks(args.source, args.output_root, options, args.pattern)
+    os.makedirs(args.output_root, exist_ok=True)
+    names = [name for name, _ in tasks]
+    results = [None] * len(tasks)
+    start = time.perf_counter()
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max(1, args.workers)) as pool:
+        futures = {pool.submit(run_task, task_argv): k for k, (_, task_argv) in enumerate(tasks)}
+        for done, future in enumerate(as_completed(futures), 1):
+            k = futures[future]
+            try:
+                results[k] = future.result()
+            except Exception as e:  # 工作进程异常退出（BrokenProcessPool）时，未完成的任务都记为失败
+                results[k] = ('error', 0.0, traceback.format_exception_only(type(e), e)[-1].strip())
+            status, elapsed, detail = results[k]
+            if not args.quiet or status == 'error':
+                print('[%d/%d] %s %s %.3fs%s' % (done, len(tasks), status, names[k], elapsed,
+                                                 ' ' + detail if status == 'error' else ''), file=sys.stderr)
+                if status == 'ok' and detail:  # 任务带--timing时的统计
+                    print(detail, end='', file=sys.stderr)
+    wall = time.perf_counter() - start
+
+    write_summary(args.summary or os.path.join(args.output_root, 'batch_summary.csv'), names, results)
+    failed = [k for k, (status, _, _) in enumerate(results) if status == 'error']
+    busy = sum(elapsed for _, elapsed, _ in results)
+    print('%d个任务，%d个失败；墙钟时间%.3fs，任务耗时合计%.3fs（%d个进程）'
+          % (len(tasks), len(failed), wall, busy, max(1, args.workers)), file=sys.stderr)
+    for k in sorted(range(len(tasks)), key=lambda k: -results[k][1])[:5]:
+        print('  %10.4fs  %s' % (results[k][1], names[k]), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# cg_algorithms各图元算法的基准测试：按参数化的负载（线段长度、斜率分布、半径、顶点数、控制点数、图元数量）计时，
+# 输出像素/秒和图元/秒，结果保存为JSON，并可与保存的基线比较，退化超过阈值时以非零状态退出
+import gc
+import sys
+import json
+import math
+import time
+import random
+import platform
+import argparse
+import cg_algorithms
+
+LINE_ALGORITHMS = ('Naive', 'DDA', 'Bresenham')
+POLYGON_ALGORITHMS = ('DDA', 'Bresenham')
+CLIP_ALGORITHMS = ('Cohen-Sutherland', 'Liang-Barsky')
+PIXEL_BUDGET = 200000  # 每个绘制负载的像素量级，图元数量按图元大小换算
+
+
+def random_segment(rng, length, slope):
+    """生成以(500, 500)附近为起点、长度约为length的线段
+
+    :param slope: (string) 'shallow'为|k|<=1，'steep'为|k|>1，'axis'为水平或竖直，'mixed'为任意方向
+    """
+    x0, y0 = rng.randint(400, 600), rng.randint(400, 600)
+    if slope == 'axis':
+        dx, dy = rng.choice([(length, 0), (-length, 0), (0, length), (0, -length)])
+    else:
+        if slope == 'shallow':
+            angle = rng.uniform(-math.pi / 4, math.pi / 4) + rng.choice([0, math.pi])
+        elif slope == 'steep':
+            angle = rng.uniform(math.pi / 4 + 0.01, 3 * math.pi / 4 - 0.01) + rng.choice([0, math.pi])
+        else:
+            angle = rng.uniform(0, 2 * math.pi)
+        dx, dy = round(length * math.cos(angle)), round(length * math.sin(angle))
+    return [[x0, y0], [x0 + dx, y0 + dy]]
+
+
+def random_polygon(rng, vertices, radius=100):
+    """生成围绕(500, 500)、顶点数为vertices的星形多边形，首尾顶点相同以保证闭合"""
+    angles = sorted(rng.uniform(0, 2 * math.pi) for _ in range(vertices))
+    p_list = [[500 + round(r * math.cos(a)), 500 + round(r * math.sin(a))]
+              for a, r in ((a, rng.uniform(radius / 2, radius)) for a in angles)]
+    return p_list + [p_list[0]]
+
+
+def clip_segment(rng, kind, window=(400, 400, 600, 600)):
+    """生成相对裁剪窗口的线段
+
+    :param kind: (string) 'inside'为两端都在窗口内，'outside'为两端在窗口同一侧之外，'straddle'为一端在内一端在外
+    """
+    x_min, y_min, x_max, y_max = window
+
+    def inside():
+        return [rng.randint(x_min, x_max), rng.randint(y_min, y_max)]
+
+    def outside():
+        x, y = rng.randint(x_min - 300, x_max + 300), rng.randint(y_min - 300, y_max + 300)
+        side = rng.randrange(4)
+        if side == 0:
+            x = rng.randint(x_min - 300, x_min - 1)
+        elif side == 1:
+            x = rng.randint(x_max + 1, x_max + 300)
+        elif side == 2:
+            y = rng.randint(y_min - 300, y_min - 1)
+        else:
+            y = rng.randint(y_max + 1, y_max + 300)
+        return [x, y], side
+
+    if kind == 'inside':
+        return [inside(), inside()]
+    p, side = outside()
+    if kind == 'straddle':
+        return [inside(), p]
+    q, _ = outside()
+    while not (side == 0 and q[0] < x_min or side == 1 and q[0] > x_max or
+               side == 2 and q[1] < y_min or side == 3 and q[1] > y_max):
+        q, _ = outside()
+    return [p, q]
+
+
+def workloads(alg, seed=0):
+    """生成全部基准负载
+
+    :param alg: 绘制后端模块，见cg_cli.load_backend；后端未提供的变换和裁剪函数使用cg_algorithms中的实现
+    :return: (list of tuple) [(name, primitives, run), ...]，run()执行一遍负载并返回生成的像素数，变换和裁剪返回0
+    """
+    rng = random.Random(seed)
+    cases = []
+
+    def add(name, calls, func, *extra):
+        def run():
+            pixels = 0
+            for args in calls:
+                pixels += len(func(*args, *extra))
+            return pixels
+        cases.append((name, len(calls), run))
+
+    def add_transform(name, calls, func, *extra):
+        def run():
+            for args in calls:
+                func(*args, *extra)
+            return 0
+        cases.append((name, len(calls), run))
+
+    for algorithm in LINE_ALGORITHMS:
+        for length in (8, 64, 512):
+            for slope in ('shallow', 'steep', 'axis', 'mixed'):
+                segments = [random_segment(rng, length, slope) for _ in range(PIXEL_BUDGET // length)]
+                add('draw_line/%s/len=%d/slope=%s' % (algorithm, length, slope),
+                    [(s,) for s in segments], alg.draw_line, algorithm)
+    for algorithm in POLYGON_ALGORITHMS:
+        segments = [random_segment(rng, 64, 'mixed') for _ in range(PIXEL_BUDGET // 64)]
+
+        def run_lines(segments=segments, algorithm=algorithm):
+            return len(alg.draw_lines(segments, algorithm)[0])
+        cases.append(('draw_lines/%s/len=64/items=%d' % (algorithm, len(segments)), len(segments), run_lines))
+        for vertices in (4, 16, 128):
+            polygons = [random_polygon(rng, vertices) for _ in range(max(1, PIXEL_BUDGET // (vertices * 80)))]
+            add('draw_polygon/%s/vertices=%d' % (algorithm, vertices), [(p,) for p in polygons],
+                alg.draw_polygon, algorithm)
+    for vertices in (4, 16, 128, 2000):
+        radius = 100 if vertices < 2000 else 2000
+        polygons = [random_polygon(rng, vertices, radius) for _ in range(max(1, PIXEL_BUDGET * 20 // (radius * radius)))]
+        add('draw_polygon/Scanline/vertices=%d,r=%d' % (vertices, radius), [(p,) for p in polygons],
+            alg.draw_polygon, 'Scanline')
+    for radius in (4, 32, 256):
+        circles = [[[rng.randint(400, 600), rng.randint(400, 600)], [0, radius]]
+                   for _ in range(max(1, PIXEL_BUDGET // (6 * radius)))]
+        add('draw_circle/r=%d' % radius, [(c,) for c in circles], alg.draw_circle, 'Midpoint')
+    for a, b in ((8, 4), (64, 32), (400, 100)):
+        ellipses = [[[rng.randint(400, 600), rng.randint(400, 600)], [a, b]]
+                    for _ in range(max(1, PIXEL_BUDGET // (4 * (a + b))))]
+        add('draw_ellipse/a=%d,b=%d' % (a, b), [(e,) for e in ellipses], alg.draw_ellipse)
+    for algorithm, points in (('Bezier', 4), ('Bezier', 16), ('B-spline', 4), ('B-spline', 100), ('B-spline', 1000)):
+        curves = [random_polygon(rng, points)[:-1] for _ in range(max(1, 2000 // points))]
+        add('draw_curve/%s/points=%d' % (algorithm, points), [(c,) for c in curves], alg.draw_curve, algorithm)
+
+    translate = getattr(alg, 'translate', cg_algorithms.translate)
+    rotate = getattr(alg, 'rotate', cg_algorithms.rotate)
+    scale = getattr(alg, 'scale', cg_algorithms.scale)
+    clip = getattr(alg, 'clip', cg_algorithms.clip)
+    for items in (100, 10000):
+        polygons = [random_polygon(rng, 16) for _ in range(items)]
+        add_transform('translate/items=%d' % items, [(p, 7, -3) for p in polygons], translate)
+        add_transform('rotate/items=%d' % items, [(p, 500, 500, 30) for p in polygons], rotate)
+        add_transform('scale/items=%d' % items, [(p, 500, 500, 1.5) for p in polygons], scale)
+    segments = [random_segment(rng, 400, 'mixed') for _ in range(10000)]
+    for algorithm in CLIP_ALGORITHMS:
+        add_transform('clip/%s/items=%d' % (algorithm, len(segments)),
+                      [(s, 400, 400, 600, 600) for s in segments], clip, algorithm)
+    clip_lines = getattr(alg, 'clip_lines', cg_algorithms.clip_lines)
+    for inside, outside, straddle in ((1, 0, 0), (0, 1, 0), (0, 0, 1), (0.8, 0.1, 0.1), (0.1, 0.8, 0.1)):
+        kinds = rng.choices(('inside', 'outside', 'straddle'), (inside, outside, straddle), k=10000)
+        segments = [clip_segment(rng, kind) for kind in kinds]
+        if alg is not cg_algorithms:  # 向量化后端的批量接口直接接收(N, 2, 2)数组，不计入列表转换的耗时
+            import numpy as np
+            segments = np.asarray(segments)
+        for algorithm in CLIP_ALGORITHMS:
+            def run_clip(segments=segments, algorithm=algorithm):
+                clip_lines(segments, 400, 400, 600, 600, algorithm)
+                return 0
+            cases.append(('clip_lines/%s/inside=%g,outside=%g,straddle=%g' % (algorithm, inside, outside, straddle),
+                          len(segments), run_clip))
+    return cases
+
+
+def measure(run, repeat=3, min_time=0.05):
+    """多次执行run，返回单遍的最短耗时（秒）和像素数
+
+    单遍耗时不足min_time时把多遍合并为一次计时，以减小计时误差；与timeit一样在计时期间关闭垃圾回收，
+    否则其他负载预先生成的大量参数对象会让每次完整回收的耗时计入当前负载
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        loops = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(loops):
+                pixels = run()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time or loops >= 1 << 20:
+                break
+            loops *= 2
+        best = elapsed / loops
+        for _ in range(repeat - 1):
+            start = time.perf_counter()
+            for _ in range(loops):
+                run()
+            best = min(best, (time.perf_counter() - start) / loops)
+    finally:
+        if enabled:
+            gc.enable()
+    return best, pixels
+
+
+def run_benchmarks(alg, pattern='', repeat=3, file=sys.stderr):
+    """执行名称包含pattern的负载
+
+    :return: (dict) 负载名 -> {'primitives', 'pixels', 'seconds', 'primitives_per_sec', 'pixels_per_sec'}
+    """
+    results = {}
+    for name, primitives, run in workloads(alg):
+        if pattern not in name:
+            continue
+        seconds, pixels = measure(run, repeat)
+        results[name] = {
+            'primitives': primitives,
+            'pixels': pixels,
+            'seconds': seconds,
+            'primitives_per_sec': primitives / seconds,
+            'pixels_per_sec': pixels / seconds if pixels else None,
+        }
+        if file is not None:
+            print('%-64s %12.0f prim/s %14s px/s' % (
+                name, primitives / seconds, '%.0f' % (pixels / seconds) if pixels else '-'), file=file)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """与基线比较单遍耗时
+
+    :param threshold: (float) 允许的退化比例，如0.2表示耗时超过基线的1.2倍视为退化
+    :return: (list of tuple) [(name, 基线耗时, 本次耗时), ...]，只包含退化的负载
+    """
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result['seconds'] > baseline[name]['seconds'] * (1 + threshold):
+            regressions.append((name, baseline[name]['seconds'], result['seconds']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='cg_algorithms基准测试')
+    parser.add_argument('--backend', choices=('python', 'numpy'), default='python', help='绘制后端')
+    parser.add_argument('-k', '--filter', default='', help='只运行名称包含该字符串的负载')
+    parser.add_argument('--repeat', type=int, default=3, help='每个负载的重复计时次数，取最短耗时')
+    parser.add_argument('-o', '--output', help='把结果保存为JSON文件')
+    parser.add_argument('--baseline', help='与该JSON结果文件比较')
+    parser.add_argument('--threshold', type=float, default=0.2, help='耗时超过基线(1 + threshold)倍视为退化')
+    args = parser.parse_args(argv)
+    baseline = None
+    if args.baseline:  # 不同后端的耗时不可比，在运行负载之前检查
+        with open(args.baseline, 'r') as fp:
+            baseline = json.load(fp)
+        if baseline.get('backend') != args.backend:
+            parser.error('baseline %s was recorded with backend %r, but this run uses backend %r'
+                         % (args.baseline, baseline.get('backend'), args.backend))
+
+    from cg_cli import load_backend
+    results = run_benchmarks(load_backend(args.backend), args.filter, args.repeat)
+    if args.output:
+        data = {
+            'backend': args.backend,
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': results,
+        }
+        with open(args.output, 'w') as fp:
+            json.dump(data, fp, indent=2)
+    if baseline is not None:
+        regressions = compare(results, baseline['results'], args.threshold)
+        for name, old, new in regressions:
+            print('regression: %s %.6fs -> %.6fs (%+.1f%%)' % (name, old, new, 100 * (new / old - 1)), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,60 +1,920 @@
 #!/usr/bin/env python
 # -*- coding:utf-8 -*-
 
-import sys
 import os
-import cg_algorithms as alg
+import sys
+import time
+import heapq
+from collections import OrderedDict
+import shlex
+import argparse
+import importlib
+import cg_algorithms
 import numpy as np
-from PIL import Image
+from cg_scene import SceneStore
 
+BACKENDS = ('python', 'numpy')
+
+
+def load_backend(name):
+    """按名称返回绘制后端模块：'python'为cg_algorithms，'numpy'为向量化的cg_algorithms_np"""
+    if name == 'numpy':
+        import cg_algorithms_np
+        return cg_algorithms_np
+    return cg_algorithms
+
+
+def as_pixel_view(array):
+    """把(..., 3)的uint8数组视为每个元素是一个RGB像素的数组，整像素赋值比逐通道赋值快得多"""
+    return np.ascontiguousarray(array, dtype=np.uint8).view('V3')[..., 0]
+
+
+def ellipse_params(p_list):
+    """把椭圆外接矩形的两个角点转换为cg_algorithms.draw_ellipse使用的[[中心], [长半轴, 短半轴]]"""
+    (x0, y0), (x1, y1) = p_list
+    return [[(x0 + x1) // 2, (y0 + y1) // 2], [abs(x1 - x0) // 2, abs(y1 - y0) // 2]]
+
+
+class RasterCache:
+    """图元光栅化结果的LRU缓存，键为(item_type, 控制点, algorithm)，按缓存的像素总数限制大小
+
+    平移不变的算法（整数运算的直线和多边形、椭圆）以第一个控制点为原点缓存相对坐标，
+    平移后的同一图元也能命中；其余算法（DDA的取整、曲线的浮点采样）以绝对坐标为键。
+    结果为裁剪前的完整像素，只缓存控制点包围盒在窗口内的图元（见contains），此时裁剪不改变结果
+    """
+    SHIFT_INVARIANT = {('line', 'Bresenham'), ('polygon', 'Bresenham'), ('polygon', 'Scanline'),
+                       ('ellipse', 'Midpoint')}
+
+    def __init__(self, max_pixels=1 << 22):
+        """
+        :param max_pixels: (int) 缓存的像素总数上限，每个像素占8字节；不大于0时不缓存
+        """
+        self.max_pixels = max_pixels
+        self.entries = OrderedDict()  # 键 -> 相对原点的像素坐标(N, 2) int32数组，最近使用的在末尾
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, item_type, p_list, algorithm, window=None):
+        """返回(key, origin)；不可缓存（包围盒超出window或缓存已关闭）时返回(None, None)"""
+        if self.max_pixels <= 0 or (window is not None and not contains(window, p_list)):
+            return None, None
+        if (item_type, algorithm) in self.SHIFT_INVARIANT:
+            x0, y0 = p_list[0]
+            return (item_type, algorithm, tuple(v for x, y in p_list for v in (x - x0, y - y0))), (x0, y0)
+        return (item_type, algorithm, tuple(v for p in p_list for v in p)), (0, 0)
+
+    def get(self, key, origin):
+        """命中时返回平移到origin的像素坐标数组（新数组），否则返回None"""
+        pixels = self.entries.get(key)
+        if pixels is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return pixels + np.array(origin, dtype=np.int32)
+
+    def put(self, key, origin, pixels):
+        if len(pixels) > self.max_pixels or key in self.entries:
+            return
+        self.entries[key] = pixels - np.array(origin, dtype=np.int32)
+        self.size += len(pixels)
+        while self.size > self.max_pixels:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self.entries), 'pixels': self.size}
+
+
+def contains(window, p_list):
+    """p_list的包围盒放宽cg_algorithms.LINE_MARGIN后是否仍在窗口(x_min, y_min, x_max, y_max)内，此时裁剪一定不改变结果"""
+    x_min, y_min, x_max, y_max = cg_algorithms.widen(window, -cg_algorithms.LINE_MARGIN)
+    return all(x_min <= x <= x_max and y_min <= y <= y_max for x, y in p_list)
+
+
+def rasterize_items(alg, items, window=None, cache=None):
+    """按顺序分组光栅化items（[(item_type, p_list, algorithm), ...]），连续的同算法线段合并为一次alg.draw_lines
+
+    :param window: (tuple of int: (x_min, y_min, x_max, y_max)) 只生成落在该闭区间内的像素：线段和多边形在光栅化前裁剪，
+        其余图元包围盒在窗口外时跳过，否则光栅化后去掉窗口外的像素
+    :param cache: (RasterCache) 光栅化结果缓存，None表示不缓存
+    :return: 生成器，依次给出(first, pixels, counts)：本组第一个图元在items中的序号、
+        本组所有图元首尾相接的像素坐标(M, 2)数组、本组各图元的像素数
+    """
+    def draw_lines(batch):
+        if cache is None:
+            pixels, offsets = alg.draw_lines([p for p, _ in batch], batch[0][1], window)
+            return np.asarray(pixels, dtype=np.int32).reshape(-1, 2), np.diff(offsets)
+        keys = [cache.key('line', p, algorithm, window) for p, algorithm in batch]
+        parts = [cache.get(key, origin) if key else None for key, origin in keys]
+        missed = [k for k, pixels in enumerate(parts) if pixels is None]
+        if missed:  # 未命中的线段仍合并为一次alg.draw_lines
+            pixels, offsets = alg.draw_lines([batch[k][0] for k in missed], batch[0][1], window)
+            pixels = np.asarray(pixels, dtype=np.int32).reshape(-1, 2)
+            for k, start, end in zip(missed, offsets, offsets[1:]):
+                parts[k] = pixels[start:end]
+                if keys[k][0]:
+                    cache.put(keys[k][0], keys[k][1], parts[k])
+        return np.concatenate(parts), np.array([len(pixels) for pixels in parts])
+
+    def draw(item_type, p_list, algorithm):
+        if item_type == 'pixels':  # 已光栅化并裁剪到窗口内的像素，见split_pixels
+            return np.asarray(p_list, dtype=np.int32).reshape(-1, 2)
+        if item_type not in ('polygon', 'ellipse', 'curve'):
+            raise ValueError('unknown item type %r' % (item_type,))
+        pixels = []
+        if item_type == 'polygon':
+            pixels = alg.draw_polygon(p_list, algorithm, window)
+        elif window is not None and not alg.overlaps(p_list, window):  # 椭圆和曲线都在p_list的包围盒内
+            pass
+        elif item_type == 'ellipse':
+            pixels = alg.draw_ellipse(ellipse_params(p_list))
+        elif item_type == 'curve':
+            pixels = alg.draw_curve(p_list, algorithm)
+        if window is not None and item_type != 'polygon' and len(pixels):
+            pixels = alg.crop(pixels, window)
+        return np.asarray(pixels, dtype=np.int32).reshape(-1, 2)
+
+    batch = []
+    first = 0
+    for i, (item_type, p_list, algorithm) in enumerate(items):
+        if item_type == 'line':
+            if batch and batch[0][1] != algorithm:
+                yield (first,) + draw_lines(batch)
+                batch = []
+            if not batch:
+                first = i
+            batch.append((p_list, algorithm))
+            continue
+        if batch:
+            yield (first,) + draw_lines(batch)
+            batch = []
+        key, origin = (cache.key(item_type, p_list, algorithm, window)
+                       if cache is not None and item_type != 'pixels' else (None, None))
+        pixels = cache.get(key, origin) if key else None
+        if pixels is None:
+            pixels = draw(item_type, p_list, algorithm)
+            if key:
+                cache.put(key, origin, pixels)
+        yield i, pixels, np.array([len(pixels)])
+    if batch:
+        yield (first,) + draw_lines(batch)
+
+
+def render_items(view, alg, items, bgr=False, origin=(0, 0), cache=None):
+    """按图元顺序把items（[item_type, p_list, algorithm, color]）绘制到画布上，画布外的部分不光栅化
+
+    同一像素被多个图元覆盖时，按NumPy花式索引赋值的规则由后出现的图元决定颜色，与逐个绘制一致；
+    扫描线填充的多边形按水平区间切片赋值，不展开为像素
+
+    :param view: (numpy.ndarray of V3, shape (height, width)) 画布的像素视图，见as_pixel_view和open_bmp，
+        像素(x, y)位于view[height - 1 - y, x]
+    :param bgr: (bool) 视图中像素的字节顺序为BGR（BMP文件的像素数组），否则为RGB
+    :param origin: (tuple of int: (x, y)) 视图左下角像素在画布中的坐标，用于只覆盖画布一部分的分块视图，
+        此时像素(x, y)位于view[origin_y + height - 1 - y, x - origin_x]
+    :param cache: (RasterCache) 光栅化结果缓存，见rasterize_items
+    """
+    items = list(items)
+    if not items:
+        return
+    height, width = view.shape
+    x_min, y_min = origin
+    top = y_min + height - 1
+    window = (x_min, y_min, x_min + width - 1, top)
+
+    def pixel_colors(rgb):
+        rgb = np.asarray(rgb, dtype=np.uint8)
+        return as_pixel_view(rgb[..., ::-1] if bgr else rgb)
+
+    start = 0
+    for end in range(len(items) + 1):
+        if end < len(items) and not (items[end][0] == 'polygon' and items[end][2] == 'Scanline'):
+            continue
+        run = items[start:end]  # 两个填充多边形之间的其余图元
+        if run:
+            colors = pixel_colors([item[3] for item in run])
+            for first, pixels, counts in rasterize_items(alg, [item[:3] for item in run], window, cache):
+                owner = first + np.repeat(np.arange(len(counts)), counts)
+                view[top - pixels[:, 1], pixels[:, 0] - x_min] = colors[owner]
+        if end < len(items):
+            color = pixel_colors(items[end][3])
+            for x0, x1, y in np.asarray(alg.fill_polygon(items[end][1], window)).reshape(-1, 3).tolist():
+                view[top - y, x0 - x_min:x1 - x_min + 1] = color
+        start = end + 1
+
+
+BMP_HEADER_SIZE = 54  # BITMAPFILEHEADER（14字节）与BITMAPINFOHEADER（40字节）
+
+
+def save_image(canvas, path):
+    """把RGB画布保存为24位BMP文件，不依赖PIL
+
+    :param canvas: (numpy.ndarray of uint8, shape (height, width, 3)) 第0行为图像的最上一行
+    """
+    height, width = canvas.shape[:2]
+    rows = np.zeros((height, (3 * width + 3) & ~3), np.uint8)  # 行尾的对齐字节为0
+    rows[:, :3 * width] = canvas[::-1, :, ::-1].reshape(height, 3 * width)  # 自下而上，BGR
+    with open(path, 'wb') as fp:
+        fp.write(bmp_header(width, height))
+        fp.write(rows.data)
+
+
+def bmp_header(width, height):
+    """24位无压缩BMP的文件头和信息头"""
+    size = ((3 * width + 3) & ~3) * height
+    return (b'BM' + (BMP_HEADER_SIZE + size).to_bytes(4, 'little') + bytes(4) +
+            BMP_HEADER_SIZE.to_bytes(4, 'little') + (40).to_bytes(4, 'little') +
+            width.to_bytes(4, 'little') + height.to_bytes(4, 'little') +
+            (1).to_bytes(2, 'little') + (24).to_bytes(2, 'little') + bytes(4) +
+            size.to_bytes(4, 'little') + bytes(16))
+
+
+def open_bmp(path, width, height):
+    """创建白色的24位BMP文件并把像素数组映射到内存，绘制直接写入文件，不需要整幅画布的内存副本和编码
+
+    BMP的像素数组自下而上逐行存放，每行按4字节对齐，像素的字节顺序为BGR；
+    第y行（y = 0为底行）恰为文件中的第y行，返回的视图行序取反后与as_pixel_view(canvas)的行序一致
+
+    :return: (numpy.memmap, numpy.ndarray of V3) 文件的内存映射和画布的像素视图，视图中像素(x, y)位于[height - 1 - y, x]，
+        字节顺序为BGR；绘制完成后调用memmap的flush并释放两者
+    """
+    create_bmp(path, width, height)
+    rows, view = map_bmp(path, width, height)
+    rows[:, :3 * width] = 255
+    return rows, view
+
+
+def create_bmp(path, width, height):
+    """写出24位BMP文件头并把文件扩展到完整大小，像素数组全为0（黑色），行尾的对齐字节保持为0"""
+    with open(path, 'wb') as fp:
+        fp.write(bmp_header(width, height))
+        fp.truncate(BMP_HEADER_SIZE + ((3 * width + 3) & ~3) * height)  # 稀疏扩展，不写出像素数组
+
+
+def map_bmp(path, width, height):
+    """把create_bmp创建的文件的像素数组映射到内存，返回值见open_bmp；多个进程可同时映射并写入互不重叠的区域"""
+    stride = (3 * width + 3) & ~3
+    rows = np.memmap(path, np.uint8, 'r+', BMP_HEADER_SIZE, (height, stride))
+    return rows, rows[:, :3 * width].view('V3')[::-1]
+
+
+def bin_items(boxes, width, height, tile):
+    """按包围盒把图元分到tile×tile的分块中
+
+    :param boxes: (numpy.ndarray of int, shape (N, 4)) 各图元像素的包围盒(x_min, y_min, x_max, y_max)，见SceneStore.bounds
+    :return: (dict) (tx, ty) -> 与该分块相交的图元序号列表（保持原有顺序），
+        分块(tx, ty)覆盖x ∈ [tx * tile, (tx + 1) * tile)、y ∈ [ty * tile, (ty + 1) * tile)
+    """
+    bins = {}
+    tiles_x, tiles_y = -(-width // tile), -(-height // tile)
+    ranges = np.empty((len(boxes), 4), np.int64)
+    ranges[:, [0, 1]] = np.maximum(boxes[:, [0, 1]] // tile, 0)
+    ranges[:, 2] = np.minimum(boxes[:, 2] // tile, tiles_x - 1)
+    ranges[:, 3] = np.minimum(boxes[:, 3] // tile, tiles_y - 1)
+    for i, (tx0, ty0, tx1, ty1) in enumerate(ranges.tolist()):
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                bins.setdefault((tx, ty), []).append(i)
+    return bins
+
+
+def split_pixels(pixels, width, height, tile):
+    """把整个图元的像素按分块分组，去掉画布外的像素，各组内保持原有顺序
+
+    :param pixels: (numpy.ndarray of int, shape (N, 2)) 像素坐标
+    :return: (dict) (tx, ty) -> 落在该分块内的像素坐标(M, 2)数组，分块的划分见bin_items
+    """
+    x, y = pixels[:, 0], pixels[:, 1]
+    pixels = pixels[(x >= 0) & (x < width) & (y >= 0) & (y < height)]
+    tiles_x = -(-width // tile)
+    ids = pixels[:, 1] // tile * tiles_x + pixels[:, 0] // tile
+    order = np.argsort(ids, kind='stable')
+    ids, pixels = ids[order], pixels[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else []
+    return {(int(ids[k]) % tiles_x, int(ids[k]) // tiles_x): part
+            for k, part in zip(starts, np.split(pixels, starts[1:]))}
+
+
+def render_tile(backend, path, width, height, window, items):
+    """把一个分块绘制到create_bmp创建的文件中，可在工作进程中执行
+
+    :param backend: (string) 绘制后端模块名，如'cg_algorithms'
+    :param window: (tuple of int: (x_min, y_min, x_max, y_max)) 分块覆盖的像素范围
+    :param items: (list of tuple) 与分块相交的图元[(item_type, p_list, algorithm, color), ...]，按z序排列
+    """
+    x_min, y_min, x_max, y_max = window
+    rows, view = map_bmp(path, width, height)
+    tile = view[height - 1 - y_max:height - y_min, x_min:x_max + 1]
+    tile[...] = as_pixel_view(np.full(3, 255, np.uint8))
+    render_items(tile, importlib.import_module(backend), items, bgr=True, origin=(x_min, y_min))
+    # 共享映射的写入直接进入页缓存，对其他进程和之后的读取立即可见；不逐块flush，否则每次都要同步整个映射
+
+
+def render_tiled(backend, width, height, items, boxes, path, tile, submit=None):
+    """分块绘制一帧：图元按包围盒分到各分块，每个分块只光栅化与它相交的图元并裁剪到分块内，直接写入内存映射的BMP文件
+
+    峰值内存取决于分块大小而非画布大小；分块按文件中的存放顺序（自下而上、自左向右）依次绘制。
+    线段和多边形在光栅化前裁剪，每个分块只生成自己的像素；椭圆和曲线只能整体光栅化后裁剪，
+    跨多个分块时在当前进程中光栅化一次，再把像素按分块分组交给各分块（见split_pixels），不在每个分块中重复光栅化
+
+    :param items: (list of tuple) [(item_type, p_list, algorithm, color), ...]，按z序排列
+    :param boxes: (numpy.ndarray of int, shape (N, 4)) 各图元的包围盒，见bin_items
+    :param tile: (int) 分块的边长（像素）
+    :param submit: 为None时在当前进程中依次绘制各分块，否则为concurrent.futures执行器的submit方法，
+        各分块并行绘制，返回future列表
+    """
+    create_bmp(path, width, height)
+    bins = bin_items(boxes, width, height, tile)
+    alg = importlib.import_module(backend)
+    spans = (np.minimum(boxes[:, 2:], (width - 1, height - 1)) // tile
+             - np.maximum(boxes[:, :2], 0) // tile) if len(boxes) else np.zeros((0, 2), np.int64)
+    parts = {}  # 图元序号 -> split_pixels的结果
+    for i in np.flatnonzero(spans.max(axis=1) > 0).tolist():
+        item_type, p_list, algorithm, color = items[i]
+        if item_type in ('line', 'polygon'):
+            continue
+        (_, pixels, _), = rasterize_items(alg, [(item_type, p_list, algorithm)], (0, 0, width - 1, height - 1))
+        parts[i] = split_pixels(pixels, width, height, tile)
+    futures = []
+    for ty in range(-(-height // tile)):
+        for tx in range(-(-width // tile)):
+            window = (tx * tile, ty * tile, min((tx + 1) * tile, width) - 1, min((ty + 1) * tile, height) - 1)
+            tile_items = [items[i] if i not in parts else ('pixels', parts[i][tx, ty], None, items[i][3])
+                          for i in bins.get((tx, ty), []) if i not in parts or (tx, ty) in parts[i]]
+            args = (backend, path, width, height, window, tile_items)
+            if submit is None:
+                render_tile(*args)
+            else:
+                futures.append(submit(render_tile, *args))
+    return futures
+
+
+def render_frame(backend, width, height, items, path, mmap=False):
+    """在工作进程中从头绘制一帧并编码保存，items为saveCanvas时的场景快照
+
+    :param backend: (string) 绘制后端模块名，如'cg_algorithms'
+    :param items: (list of tuple) [(item_type, p_list, algorithm, color), ...]
+    :param path: (string) 输出文件路径
+    :param mmap: (bool) 为True时直接绘制到内存映射的BMP文件中，见open_bmp
+    """
+    alg = importlib.import_module(backend)
+    if mmap:
+        rows, view = open_bmp(path, width, height)
+        render_items(view, alg, items, bgr=True)
+        rows.flush()
+        return path
+    canvas = np.zeros([height, width, 3], np.uint8)
+    canvas.fill(255)
+    render_items(as_pixel_view(canvas), alg, items)
+    save_image(canvas, path)
+    return path
 
-if __name__ == '__main__':
-    input_file = sys.argv[1]
-    output_dir = sys.argv[2]
-    os.makedirs(output_dir, exist_ok=True)
-
-    item_dict = {}
-    pen_color = np.zeros(3, np.uint8)
-    width = 0
-    height = 0
-
-    with open(input_file, 'r') as fp:
-        line = fp.readline()
-        while line:
-            line = line.strip().split(' ')
-            if line[0] == 'resetCanvas':
-                width = int(line[1])
-                height = int(line[2])
-                item_dict = {}
-            elif line[0] == 'saveCanvas':
-                save_name = line[1]
-                canvas = np.zeros([height, width, 3], np.uint8)
-                canvas.fill(255)
-                for item_type, p_list, algorithm, color in item_dict.values():
-                    if item_type == 'line':
-                        pixels = alg.draw_line(p_list, algorithm)
-                        for x, y in pixels:
-                            canvas[height - 1 - y, x] = color
-                    elif item_type == 'polygon':
-                        pass
-                    elif item_type == 'ellipse':
-                        pass
-                    elif item_type == 'curve':
-                        pass
-                Image.fromarray(canvas).save(os.path.join(output_dir, save_name + '.bmp'), 'bmp')
-            elif line[0] == 'setColor':
-                pen_color[0] = int(line[1])
-                pen_color[1] = int(line[2])
-                pen_color[2] = int(line[3])
-            elif line[0] == 'drawLine':
-                item_id = line[1]
-                x0 = int(line[2])
-                y0 = int(line[3])
-                x1 = int(line[4])
-                y1 = int(line[5])
-                algorithm = line[6]
-                item_dict[item_id] = ['line', [[x0, y0], [x1, y1]], algorithm, np.array(pen_color)]
-            ...
-
-            line = fp.readline()
 
+def pixel_index(pixels, height, width):
+    """把画布内的像素坐标转换为按行展开的画布中的下标，与canvas[height - 1 - y, x]对应"""
+    return (height - 1 - pixels[:, 1].astype(np.int64)) * width + pixels[:, 0]
+
+
+class Compositor:
+    """增量合成的画布
+
+    在多次saveCanvas之间保留画布、每个像素上最上层图元的z序号，以及每个图元上次合成时的像素下标和颜色。
+    每次合成只重新光栅化变化过的图元：先擦除它们旧像素中仍在最上层的部分，用覆盖这些像素的其余图元
+    按z序重新合成，再画上它们的新像素。
+
+    图元记录按槽位存放；“像素 -> 覆盖它的槽位”的倒排表（CSR格式）在需要擦除时才按需重建，
+    重建之后新增的槽位数量较少，按包围盒逐个检查
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.canvas = np.full((height, width, 3), 255, np.uint8)
+        self.pixels = as_pixel_view(self.canvas).reshape(-1)  # 与canvas共享内存的一维像素视图
+        self.owner = np.full(height * width, -1, np.int64)  # 每个像素上最上层图元的z序号，-1为背景
+        self.slots = {}  # 图元id -> 记录槽位，槽位在重建倒排表前不会复用
+        # 按槽位存放的记录：图元id、z序号、包围盒（像素下标的行列范围）、颜色和像素下标数组
+        self.slot_ids = []
+        self.slot_index = []
+        self.slot_z = np.zeros(0, np.int64)
+        self.slot_box = np.zeros((0, 4), np.int64)
+        self.slot_rgb = np.zeros((0, 3), np.uint8)
+        self.slot_alive = np.zeros(0, bool)
+        # 倒排表：像素p被槽位cover_slot[cover_ptr[p]:cover_ptr[p + 1]]覆盖，只包含base_end之前的槽位
+        self.cover_ptr = None
+        self.cover_slot = None
+        self.base_end = 0
+        self.base_pixels = 0  # 倒排表中的像素数
+        self.stale_pixels = 0  # 倒排表之外的新增像素数与倒排表中已删除的像素数之和
+
+    def _store(self, item_id, z, index, box, color):
+        slot = len(self.slot_ids)
+        if slot == len(self.slot_z):  # 扩容
+            size = max(2 * slot, 16)
+            self.slot_z = np.resize(self.slot_z, size)
+            self.slot_box = np.resize(self.slot_box, (size, 4))
+            self.slot_rgb = np.resize(self.slot_rgb, (size, 3))
+            self.slot_alive = np.concatenate([self.slot_alive, np.zeros(size - slot, bool)])
+        self.slots[item_id] = slot
+        self.slot_ids.append(item_id)
+        self.slot_index.append(index)
+        self.slot_z[slot] = z
+        self.slot_box[slot] = box
+        self.slot_rgb[slot] = color
+        self.slot_alive[slot] = True
+        self.stale_pixels += len(index)
+
+    def _release(self, item_id):
+        slot = self.slots.pop(item_id)
+        self.slot_alive[slot] = False
+        index = self.slot_index[slot]
+        self.slot_index[slot] = None
+        if slot < self.base_end:
+            self.stale_pixels += len(index)
+        else:
+            self.stale_pixels -= len(index)
+        return self.slot_z[slot], index
+
+    def _rebuild(self):
+        """压缩槽位并重建倒排表"""
+        alive = np.flatnonzero(self.slot_alive[:len(self.slot_ids)])
+        self.slot_ids = [self.slot_ids[slot] for slot in alive]
+        self.slot_index = [self.slot_index[slot] for slot in alive]
+        n = len(alive)
+        self.slot_z = self.slot_z[alive]
+        self.slot_box = self.slot_box[alive]
+        self.slot_rgb = self.slot_rgb[alive]
+        self.slot_alive = np.ones(n, bool)
+        self.slots = dict(zip(self.slot_ids, range(n)))
+        lengths = np.fromiter(map(len, self.slot_index), np.int64, n)
+        index = np.concatenate(self.slot_index) if n else np.zeros(0, np.int64)
+        self.cover_slot = np.repeat(np.arange(n, dtype=np.int32), lengths)[np.argsort(index, kind='stable')]
+        self.cover_ptr = np.zeros(len(self.owner) + 1, np.int64)
+        np.cumsum(np.bincount(index, minlength=len(self.owner)), out=self.cover_ptr[1:])
+        self.base_end = n
+        self.base_pixels = len(index)
+        self.stale_pixels = 0
+
+    def _covering(self, erased):
+        """返回覆盖erased中像素的未删除图元：(像素下标数组, 槽位数组)"""
+        if self.cover_ptr is None or self.stale_pixels > self.base_pixels // 2:
+            self._rebuild()
+        # 倒排表中的槽位：把每个像素的区间[cover_ptr[p], cover_ptr[p + 1])首尾相接
+        starts = self.cover_ptr[erased]
+        lengths = self.cover_ptr[erased + 1] - starts
+        ends = np.cumsum(lengths)
+        entries = np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - (ends - lengths), lengths)
+        pixels = [np.repeat(erased, lengths)]
+        slots = [self.cover_slot[entries].astype(np.int64)]
+        # 重建之后新增的槽位
+        rows, cols = erased // self.width, erased % self.width
+        r0, r1, c0, c1 = rows.min(), rows.max(), cols.min(), cols.max()
+        box = self.slot_box[self.base_end:len(self.slot_ids)]
+        hit = (box[:, 0] <= r1) & (r0 <= box[:, 1]) & (box[:, 2] <= c1) & (c0 <= box[:, 3])
+        recent = self.base_end + np.flatnonzero(hit)
+        if len(recent):
+            mask = np.zeros(len(self.owner), bool)
+            mask[erased] = True
+            for slot in recent:
+                if self.slot_alive[slot]:
+                    index = self.slot_index[slot]
+                    index = index[mask[index]]
+                    pixels.append(index)
+                    slots.append(np.full(len(index), slot))
+        pixels = np.concatenate(pixels)
+        slots = np.concatenate(slots)
+        alive = self.slot_alive[slots]
+        return pixels[alive], slots[alive]
+
+    def _paint(self, index, z, colors):
+        """按z升序排列的像素合成到画布上，只覆盖当前最上层图元z较小的像素"""
+        keep = self.owner[index] < z
+        # z升序排列时，同一像素上后赋值（z较大）的图元生效
+        self.owner[index[keep]] = z[keep]
+        self.pixels[index[keep]] = colors[keep]
+
+    def update(self, alg, scene, dirty, cache=None):
+        """把自上次合成以来变化过的图元合成到画布上
+
+        :param alg: 绘制后端模块
+        :param scene: (cg_scene.SceneStore) 场景，行号即z序号，越大越靠上层
+        :param dirty: 自上次合成以来新增、修改或删除的图元id集合
+        :param cache: (RasterCache) 光栅化结果缓存，见rasterize_items
+        """
+        erased = []
+        for item_id in dirty:
+            if item_id in self.slots:
+                z, index = self._release(item_id)
+                erased.append(index[self.owner[index] == z])
+        erased = np.unique(np.concatenate(erased)) if erased else []
+        if len(erased):
+            self.owner[erased] = -1
+            self.pixels[erased] = as_pixel_view(np.full(3, 255, np.uint8))
+            # 覆盖被擦除像素的未变化图元按z序重新合成
+            index, slots = self._covering(erased)
+            order = np.argsort(self.slot_z[slots], kind='stable')
+            index, slots = index[order], slots[order]
+            self._paint(index, self.slot_z[slots], as_pixel_view(self.slot_rgb)[slots])
+        changed = np.sort(scene.row_of([item_id for item_id in dirty if item_id in scene]))
+        window = (0, 0, self.width - 1, self.height - 1)
+        items = list(scene.items(changed))
+        for first, pixels, counts in rasterize_items(alg, [item[:3] for item in items], window, cache):
+            ids = [scene.ids[row] for row in changed[first:first + len(counts)].tolist()]
+            index = pixel_index(pixels, self.height, self.width)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            # 各图元像素的行列范围，空图元的包围盒记为不与任何区域相交
+            boxes = np.tile([1, 0, 1, 0], (len(ids), 1))
+            nonempty = counts > 0
+            if len(index):
+                rows, cols = index // self.width, index % self.width
+                at = starts[nonempty]
+                boxes[nonempty] = np.stack([np.minimum.reduceat(rows, at), np.maximum.reduceat(rows, at),
+                                            np.minimum.reduceat(cols, at), np.maximum.reduceat(cols, at)], axis=1)
+            colors = scene.colors[changed[first:first + len(counts)]]
+            zs = changed[first:first + len(counts)]
+            for k, item_id in enumerate(ids):
+                self._store(item_id, zs[k], index[starts[k]:starts[k] + counts[k]], boxes[k], colors[k])
+            owner = np.repeat(np.arange(len(ids)), counts)
+            self._paint(index, zs[owner], as_pixel_view(colors)[owner])
+
+
+class CommandRunner:
+    """命令文件解释器
+
+    逐行读取命令，按命令名在分派表中找到处理函数执行，不会把整个命令文件读入内存；
+    同时按命令名统计执行次数和耗时，并记录耗时最长的若干条命令
+    """
+    def __init__(self, output_dir, alg, slowest=10, incremental=True, jobs=1, mmap=False, tile=0,
+                 cache_pixels=1 << 22):
+        """
+        :param output_dir: (string) saveCanvas输出目录
+        :param alg: 绘制后端模块，见load_backend
+        :param slowest: (int) 记录耗时最长的命令条数
+        :param incremental: (bool) 为True时在多次saveCanvas之间增量合成画布，否则每次从头绘制
+        :param jobs: (int) 大于1时saveCanvas只保存场景快照，由jobs个进程并行绘制和编码各帧，需调用close等待完成
+        :param mmap: (bool) 为True时每帧从头直接绘制到内存映射的BMP文件中，不在内存中保留画布，也不做增量合成
+        :param tile: (int) 大于0时每帧按tile×tile分块绘制到内存映射的BMP文件中，见render_tiled；
+            jobs大于1时各分块由进程池并行绘制，saveCanvas等待整帧完成
+        :param cache_pixels: (int) 本进程内光栅化结果缓存的像素总数上限，见RasterCache；不大于0时不缓存
+        """
+        self.output_dir = output_dir
+        self.alg = alg
+        self.incremental = incremental
+        self.jobs = jobs
+        self.mmap = mmap
+        self.tile = tile
+        self.pool = None
+        self.frames = []  # 按提交顺序排列的(输出路径, future)
+        self.scene = SceneStore()  # 行号即z序号；椭圆的控制点为外接矩形的两个角点
+        self.dirty = set()  # 自上次saveCanvas以来新增、修改或删除的图元id
+        self.pending = {}  # 图元id -> 尚未应用到p_list的变换矩阵，连续的变换合成为一个矩阵
+        self.compositor = None
+        self.cache = RasterCache(cache_pixels)
+        self.pen_color = np.zeros(3, np.uint8)
+        self.width = 0
+        self.height = 0
+        self.handlers = {
+            'resetCanvas': self.reset_canvas,
+            'saveCanvas': self.save_canvas,
+            'saveScene': self.save_scene,
+            'loadScene': self.load_scene,
+            'setColor': self.set_color,
+            'drawLine': self.draw_line,
+            'drawPolygon': self.draw_polygon,
+            'drawEllipse': self.draw_ellipse,
+            'drawCurve': self.draw_curve,
+            'translate': self.translate,
+            'rotate': self.rotate,
+            'scale': self.scale,
+            'clip': self.clip,
+        }
+        self.timings = {}  # 命令名 -> [执行次数, 总耗时（秒）]
+        self.slowest = []  # (耗时, 行号, 命令)的小顶堆
+        self.slowest_count = slowest
+
+    def run(self, lines):
+        """依次执行lines（文件对象或任意字符串迭代器）中的命令"""
+        for lineno, line in enumerate(lines, 1):
+            self.execute(line, lineno)
+
+    def execute(self, line, lineno=0):
+        args = line.split()
+        if not args:
+            return
+        handler = self.handlers.get(args[0])
+        if handler is None:
+            raise ValueError('第%d行：未知命令 %s' % (lineno, args[0]))
+        start = time.perf_counter()
+        handler(*args[1:])
+        elapsed = time.perf_counter() - start
+        record = self.timings.setdefault(args[0], [0, 0.0])
+        record[0] += 1
+        record[1] += elapsed
+        entry = (elapsed, lineno, line.strip())
+        if len(self.slowest) < self.slowest_count:
+            heapq.heappush(self.slowest, entry)
+        elif self.slowest and entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def report(self, file=sys.stderr):
+        """输出按命令名汇总的耗时统计以及耗时最长的命令"""
+        total = sum(t for _, t in self.timings.values())
+        print('%-12s %8s %10s %10s %6s' % ('command', 'count', 'total(s)', 'mean(ms)', '%'), file=file)
+        for name, (count, t) in sorted(self.timings.items(), key=lambda kv: -kv[1][1]):
+            print('%-12s %8d %10.4f %10.4f %6.1f' % (name, count, t, 1000 * t / count, 100 * t / total if total else 0),
+                  file=file)
+        if self.slowest:
+            print('slowest commands:', file=file)
+            for t, lineno, line in sorted(self.slowest, reverse=True):
+                print('  %10.4fs  line %d: %s' % (t, lineno, line[:60]), file=file)
+        if self.cache.hits or self.cache.misses:
+            print('raster cache: %(hits)d hits, %(misses)d misses, %(evictions)d evictions, '
+                  '%(entries)d entries, %(pixels)d pixels' % self.cache.stats(), file=file)
+
+    def reset_canvas(self, width, height):
+        self.width = int(width)
+        self.height = int(height)
+        self.scene.clear()
+        self.dirty = set()
+        self.pending = {}
+        self.compositor = None
+
+    def apply_transforms(self):
+        """把所有图元累积的变换矩阵一次性应用到控制点上，每个控制点只取整一次"""
+        if not self.pending:
+            return
+        self.scene.transform(list(self.pending), list(self.pending.values()))
+        self.pending = {}
+
+    def add_transform(self, item_id, m):
+        if item_id not in self.scene:
+            raise KeyError(item_id)
+        old = self.pending.get(item_id)
+        self.pending[item_id] = m if old is None else cg_algorithms.compose(m, old)
+        self.dirty.add(item_id)
+
+    def save_canvas(self, save_name):
+        self.apply_transforms()
+        path = os.path.join(self.output_dir, save_name + '.bmp')
+        window = (0, 0, self.width - 1, self.height - 1)
+        if self.tile > 0:
+            submit = self.executor().submit if self.jobs > 1 else None
+            rows = self.scene.cull(window)
+            for future in render_tiled(self.alg.__name__, self.width, self.height, self.snapshot(rows),
+                                       self.scene.bounds(rows), path, self.tile, submit):
+                future.result()
+            return
+        if self.jobs > 1:
+            self.submit_frame(path)
+            return
+        if self.mmap:
+            rows, view = open_bmp(path, self.width, self.height)
+            render_items(view, self.alg, self.scene.items(self.scene.cull(window)), bgr=True, cache=self.cache)
+            rows.flush()
+            return
+        if self.incremental:
+            if self.compositor is None:  # 新的合成画布需要绘制所有图元
+                self.compositor = Compositor(self.width, self.height)
+                self.dirty = set(self.scene)
+            self.compositor.update(self.alg, self.scene, self.dirty, self.cache)
+            self.dirty = set()
+            canvas = self.compositor.canvas
+        else:
+            canvas = np.zeros([self.height, self.width, 3], np.uint8)
+            canvas.fill(255)
+            render_items(as_pixel_view(canvas), self.alg, self.scene.items(self.scene.cull(window)), cache=self.cache)
+        save_image(canvas, path)
+
+    def save_scene(self, save_name):
+        """把场景保存为二进制场景文件output_dir/save_name.cgs，画布大小和画笔颜色一并保存"""
+        self.apply_transforms()
+        self.scene.save(os.path.join(self.output_dir, save_name + '.cgs'), 'cli',
+                        {'width': self.width, 'height': self.height, 'color': self.pen_color.tolist()})
+
+    def load_scene(self, path):
+        """打开save_scene保存的场景文件，替换当前的画布、场景和画笔颜色"""
+        scene, meta = SceneStore.load(path, 'cli')  # 图形界面保存的场景转换为命令行的坐标约定
+        self.reset_canvas(meta['width'], meta['height'])
+        self.scene = scene
+        self.pen_color[:] = meta.get('color', (0, 0, 0))
+
+    def submit_frame(self, path):
+        """把当前场景的快照交给进程池绘制并保存到path
+
+        图元的p_list在变换时整体替换而不会原地修改，快照只需复制每个图元的列表本身，颜色转为元组以减少序列化开销；
+        同名输出在前一次写入完成后才提交，保证文件内容是最后一次saveCanvas的结果。
+        未完成的帧超过jobs的两倍时等待最早的一帧，以限制快照占用的内存
+        """
+        pool = self.executor()
+        for pending_path, future in self.frames:
+            if pending_path == path:
+                future.result()
+        while len(self.frames) >= 2 * self.jobs:
+            self.frames.pop(0)[1].result()
+        rows = self.scene.cull((0, 0, self.width - 1, self.height - 1))
+        future = pool.submit(render_frame, self.alg.__name__, self.width, self.height, self.snapshot(rows), path,
+                             self.mmap)
+        self.frames.append((path, future))
+
+    def executor(self):
+        """按需创建jobs个进程的进程池"""
+        if self.pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(self.jobs)
+        return self.pool
+
+    def snapshot(self, rows=None):
+        """场景中rows（默认为所有图元）按z序排列的快照[(item_type, p_list, algorithm, color), ...]，用于交给工作进程绘制
+
+        颜色转为元组，使快照不引用场景中的数组，提交后场景的修改不影响快照
+        """
+        return [(item_type, p_list, algorithm, tuple(color.tolist()))
+                for item_type, p_list, algorithm, color in self.scene.items(rows)]
+
+    def close(self):
+        """等待进程池中的帧全部保存完毕，按提交顺序抛出第一个失败帧的异常"""
+        if self.pool is None:
+            return
+        try:
+            while self.frames:
+                self.frames.pop(0)[1].result()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+            self.frames = []
+
+    def set_color(self, r, g, b):
+        self.pen_color[0] = int(r)
+        self.pen_color[1] = int(g)
+        self.pen_color[2] = int(b)
+
+    def add_item(self, item_id, item_type, p_list, algorithm):
+        self.scene.put(item_id, item_type, p_list, algorithm, self.pen_color)  # 重复的id沿用原有的z序
+        self.pending.pop(item_id, None)
+        self.dirty.add(item_id)
+
+    def draw_line(self, item_id, x0, y0, x1, y1, algorithm):
+        self.add_item(item_id, 'line', [[int(x0), int(y0)], [int(x1), int(y1)]], algorithm)
+
+    def draw_polygon(self, item_id, *args):
+        p_list = parse_points(args[:-1])
+        # 命令给出的顶点不重复首点，补上首点使draw_polygon绘制闭合的多边形
+        self.add_item(item_id, 'polygon', p_list + [p_list[0]], args[-1])
+
+    def draw_ellipse(self, item_id, x0, y0, x1, y1):
+        self.add_item(item_id, 'ellipse', [[int(x0), int(y0)], [int(x1), int(y1)]], 'Midpoint')
+
+    def draw_curve(self, item_id, *args):
+        self.add_item(item_id, 'curve', parse_points(args[:-1]), args[-1])
+
+    def translate(self, item_id, dx, dy):
+        self.add_transform(item_id, cg_algorithms.translate_matrix(int(dx), int(dy)))
+
+    def rotate(self, item_id, x, y, r):
+        if self.scene.item_type(item_id) != 'ellipse':  # 椭圆不做旋转
+            self.add_transform(item_id, cg_algorithms.rotate_matrix(int(x), int(y), int(r)))
+
+    def scale(self, item_id, x, y, s):
+        self.add_transform(item_id, cg_algorithms.scale_matrix(int(x), int(y), float(s)))
+
+    def clip(self, item_id, x0, y0, x1, y1, algorithm):
+        if self.scene.item_type(item_id) != 'line':  # 只裁剪线段
+            return
+        self.apply_transforms()
+        p_list = cg_algorithms.clip(self.scene.p_list(item_id), int(x0), int(y0), int(x1), int(y1), algorithm)
+        if p_list:
+            self.scene.set_points(item_id, p_list)
+        else:  # 完全在裁剪窗口外
+            self.scene.remove(item_id)
+        self.dirty.add(item_id)
+
+
+def parse_points(args):
+    return [[int(args[i]), int(args[i + 1])] for i in range(0, len(args) - 1, 2)]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description='执行命令文件并保存画布；频繁启动时可用python -m cg_cli运行以复用编译好的字节码，'
+                    '或用--serve在一个常驻进程中依次执行多个命令文件')
+    parser.add_argument('input_file', nargs='?', help="命令文件，'-'表示从标准输入读取")
+    parser.add_argument('output_dir', nargs='?')
+    parser.add_argument('--backend', choices=BACKENDS, default='python', help='绘制后端')
+    parser.add_argument('--timing', action='store_true', help='输出各命令的耗时统计（到标准错误，服务模式下随应答返回）')
+    parser.add_argument('--full-redraw', action='store_true', help='每次saveCanvas都从头绘制所有图元，不做增量合成')
+    parser.add_argument('--jobs', type=int, default=1, help='并行绘制和保存各帧的进程数，大于1时不做增量合成')
+    parser.add_argument('--scene', help='执行命令前先打开该场景文件，见saveScene')
+    parser.add_argument('--mmap', action='store_true',
+                        help='直接绘制到内存映射的BMP文件中，适合超大画布；每帧从头绘制，不做增量合成')
+    parser.add_argument('--tile', type=int, default=0,
+                        help='按该边长分块绘制到内存映射的BMP文件中，峰值内存只取决于分块大小；与--jobs一起使用时并行绘制各分块')
+    parser.add_argument('--cache-pixels', type=int, default=1 << 22,
+                        help='光栅化结果缓存的像素总数上限（每像素8字节），0表示不缓存；命中统计随--timing输出')
+    parser.add_argument('--serve', metavar='ADDRESS',
+                        help="常驻服务模式：从ADDRESS（'-'为标准输入，否则为本地套接字路径）逐行读取任务，"
+                             "每行为一次运行的命令行参数（如'input.txt output_dir --backend numpy'），见serve")
+    return parser
+
+
+def run_job(args, file=sys.stderr):
+    """按解析后的命令行参数执行一个命令文件，--timing的统计输出到file"""
+    os.makedirs(args.output_dir, exist_ok=True)
+    runner = CommandRunner(args.output_dir, load_backend(args.backend), incremental=not args.full_redraw,
+                           jobs=args.jobs, mmap=args.mmap, tile=args.tile, cache_pixels=args.cache_pixels)
+    try:
+        if args.scene:
+            runner.load_scene(args.scene)
+        if args.input_file == '-':
+            runner.run(sys.stdin)
+        else:
+            with open(args.input_file, 'r') as fp:
+                runner.run(fp)
+    finally:
+        runner.close()
+    if args.timing:
+        runner.report(file)
+
+
+def parse_task(parser, argv):
+    """把一个任务的命令行参数解析为run_job的参数，参数无效时抛出ValueError而不是退出进程
+
+    argparse的用法错误（以及-h的帮助）不写到服务进程的标准错误和标准输出，而是作为异常信息交给调用方
+    """
+    import io
+    import contextlib
+    message = io.StringIO()
+    try:
+        with contextlib.redirect_stderr(message), contextlib.redirect_stdout(message):
+            args = parser.parse_args(argv)
+    except SystemExit as e:
+        if not e.code:  # -h/--help
+            raise ValueError('任务中不能使用-h/--help')
+        lines = message.getvalue().strip().splitlines()
+        raise ValueError(lines[-1] if lines else '无法解析参数：%s' % ' '.join(argv))
+    if args.serve or args.output_dir is None or args.input_file == '-':
+        raise ValueError('任务须给出命令文件和输出目录，不能嵌套--serve或从标准输入读取命令')
+    return args
+
+
+def serve_lines(parser, lines, out):
+    """依次执行lines中的任务，每个任务的应答写入out：--timing的统计，最后一行为'ok 耗时（秒）'或'error 原因'
+
+    任务之间不共享场景和画布，已导入的模块和NumPy后端保持加载，省去每个命令文件的进程启动和导入开销
+    """
+    for line in lines:
+        start = time.perf_counter()
+        try:
+            argv = shlex.split(line)  # 引号不配对时抛出ValueError，作为本任务的错误应答
+            if not argv:
+                continue
+            run_job(parse_task(parser, argv), out)
+        except Exception as e:
+            print('error %s: %s' % (type(e).__name__, e), file=out)
+        else:
+            print('ok %.4f' % (time.perf_counter() - start), file=out)
+        out.flush()
+
+
+def serve(parser, address):
+    """常驻服务：address为'-'时从标准输入读取任务、应答写到标准输出，否则在该路径上监听本地（Unix域）套接字，
+    每个连接可发送任意多行任务，直到关闭连接。服务在标准输入结束、收到KeyboardInterrupt或SIGTERM时退出"""
+    if address == '-':
+        serve_lines(parser, iter(sys.stdin.readline, ''), sys.stdout)
+        return
+    import io
+    import signal
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            out = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+            serve_lines(parser, io.TextIOWrapper(self.rfile, encoding='utf-8'), out)
+            out.detach()
+
+    server = socketserver.UnixStreamServer(address, Handler)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))  # 被终止时同样删除套接字文件
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(address)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.serve:
+        serve(parser, args.serve)
+    elif args.output_dir is None:
+        parser.error('需要给出input_file和output_dir，或使用--serve')
+    else:
+        run_job(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,11 @@
 
 import sys
 import cg_algorithms as alg
+import numpy as np
+from cg_spatial import GridIndex
+from cg_scene import SceneStore
+from cg_profile import Profiler, format_frame
+from cg_headless import PEN_FOOTPRINT, item_rect, local_bounds, visible_window, rasterize_item, footprint_runs
 from typing import Optional
 from PyQt5.QtWidgets import (
     QApplication,
@@ -19,9 +24,13 @@ from PyQt5.QtWidgets import (
     QFormLayout,
     QSpinBox,
     QMessageBox,
-    QDialogButtonBox)
-from PyQt5.QtGui import QPainter, QMouseEvent, QColor, QPen
-from PyQt5.QtCore import QRectF
+    QDialogButtonBox,
+    QActionGroup,
+    QRubberBand,
+    QFileDialog,
+    QLabel)
+from PyQt5.QtGui import QPainter, QMouseEvent, QColor, QPen, QImage
+from PyQt5.QtCore import QRectF, QRect, Qt
 
 
 class MyCanvas(QGraphicsView):
@@ -34,6 +43,9 @@ class MyCanvas(QGraphicsView):
         self.list_widget = None
         self.item_dict = {}
         self.selected_id = ''
+        self.selected_ids = []  # 所有选中的图元（框选时可多于一个），selected_id为其中最上层的一个
+        self.index = GridIndex()  # item_dict中图元包围盒的空间索引，用于点选和框选
+        self.store = SceneStore()  # 已完成图元的几何参数、算法和颜色，MyItem从中读取
 
         self.status = ''
         self.temp_algorithm = ''
@@ -41,6 +53,8 @@ class MyCanvas(QGraphicsView):
         self.temp_item = None
         self.my_color = QColor(0, 0, 0)
         self.temp_pos = None  # 用于平移等的临时坐标
+        self.select_origin = None  # 框选起点（视图坐标）
+        self.rubber_band = QRubberBand(QRubberBand.Rectangle, self.viewport())
 
     def set_my_color(self, r: int, g: int, b: int):
         # 颜色的Alpha通道指定透明效果，0表示完全透明的颜色，而255表示完全不透明的颜色
@@ -66,42 +80,90 @@ class MyCanvas(QGraphicsView):
         self.temp_algorithm = algorithm
         self.temp_id = item_id
 
+    def start_draw_curve(self, algorithm, item_id):
+        self.status = 'curve'
+        self.temp_algorithm = algorithm
+        self.temp_id = item_id
+
     def start_translate(self):
         self.status = 'translate'
 
+    def start_select(self):
+        self.status = 'select'
+
     def finish_draw(self):  # finish后得到下一个图元对应id
+        if self.temp_item is not None:
+            self.temp_item.attach(self.store)
         self.temp_id = self.main_window.get_id()
 
+    def repaint_rect(self, rect: QRectF):
+        """只重绘场景中rect所在的区域，向外扩展2像素以包含画笔宽度和选中框"""
+        if not rect.isNull():
+            self.scene().update(rect.adjusted(-2, -2, 2, 2))
+
+    def begin_change(self, item) -> QRectF:
+        """在修改item的几何参数前调用，返回修改前的包围盒"""
+        if item is None:
+            return QRectF()
+        item.prepareGeometryChange()
+        return item.boundingRect()
+
+    def end_change(self, item, old_rect: QRectF):
+        """修改完成后重绘新旧包围盒的并集，并更新空间索引"""
+        if item is not None:
+            old_rect = old_rect.united(item.boundingRect())
+            if self.item_dict.get(item.id) is item:
+                self.index.update(item.id, item_bounds(item))
+        self.repaint_rect(old_rect)
+
     def clear_selection(self):
-        if self.selected_id != '':
-            self.item_dict[self.selected_id].selected = False
-            self.selected_id = ''
+        for item_id in self.selected_ids:
+            self.item_dict[item_id].selected = False
+            self.repaint_rect(self.item_dict[item_id].boundingRect())
+        self.selected_ids = []
+        self.selected_id = ''
+
+    def select_items(self, ids):
+        """选中ids中的图元（按层次从下到上排列），列表中同步选中最上层的一个"""
+        self.clear_selection()
+        for item_id in ids:
+            self.item_dict[item_id].selected = True
+            self.repaint_rect(self.item_dict[item_id].boundingRect())
+        self.selected_ids = list(ids)
+        self.selected_id = ids[-1] if ids else ''
+        self.list_widget.blockSignals(True)  # 避免触发selection_changed把多选重置为单选
+        if ids:
+            self.list_widget.setCurrentItem(self.list_widget.findItems(ids[-1], Qt.MatchExactly)[0])
+        else:
+            self.list_widget.clearSelection()
+        self.list_widget.blockSignals(False)
+        self.main_window.statusBar().showMessage('选中%d个图元' % len(ids))
 
     def selection_changed(self, selected):
         if selected == '':
             return
-        if self.selected_id != '':
-            self.item_dict[self.selected_id].selected = False
-            self.item_dict[self.selected_id].update()
+        self.clear_selection()
         if self.status == 'translate':  # 图元平移部分
             self.main_window.statusBar().showMessage('图元平移： %s' % selected)
             self.selected_id = selected
+            self.selected_ids = [selected]
             self.item_dict[selected].selected = True
-            self.item_dict[selected].update()
-            self.updateScene([self.sceneRect()])
+            self.repaint_rect(self.item_dict[selected].boundingRect())
             return
         self.main_window.statusBar().showMessage('图元选择： %s' % selected)
         self.selected_id = selected
+        self.selected_ids = [selected]
         self.item_dict[selected].selected = True
-        self.item_dict[selected].update()
+        self.repaint_rect(self.item_dict[selected].boundingRect())
         self.status = ''
-        self.updateScene([self.sceneRect()])
 
     def mousePressEvent(self, event: QMouseEvent) -> None:
         self.setMouseTracking(True)
         pos = self.mapToScene(event.localPos().toPoint())
         x = int(pos.x())
         y = int(pos.y())
+        changed_item = self.temp_item  # 本次事件中几何参数发生变化的图元
+        old_rect = self.begin_change(changed_item)
         if self.status == 'line':
             if self.temp_item is None:
                 temp_color = QColor(self.my_color)
@@ -128,6 +190,21 @@ class MyCanvas(QGraphicsView):
                     self.temp_item = None  # ?
                 else:
                     self.temp_item.p_list += [[x, y]]
+        elif self.status == 'curve':  # 左键添加控制点，右键结束
+            if self.temp_item is None:
+                if event.button() == Qt.LeftButton:
+                    temp_color = QColor(self.my_color)
+                    self.temp_item = MyItem(self.temp_id, self.status, [[x, y], [x, y]], self.temp_algorithm, None, temp_color)
+                    self.scene().addItem(self.temp_item)
+            elif event.button() == Qt.RightButton:
+                self.temp_item.p_list.pop()  # 去掉跟随鼠标的控制点
+                self.item_dict[self.temp_id] = self.temp_item
+                self.list_widget.addItem(self.temp_id)
+                self.finish_draw()
+                self.temp_item = None
+            else:
+                self.temp_item.p_list[-1] = [x, y]
+                self.temp_item.p_list += [[x, y]]
         elif self.status == 'circle':  # list[0]是圆心 list[1][1]是半径
             if self.temp_item is None:
                 temp_color = QColor(self.my_color)
@@ -150,19 +227,46 @@ class MyCanvas(QGraphicsView):
                 self.temp_item = None
 
         if self.status == 'translate':
-            if self.selected_id in self.item_dict.keys() and self.item_dict[self.selected_id].boundingRect().contains(x, y):  # 选中的矩形区域包含该点
+            if set(self.index.query_point(x, y)) & set(self.selected_ids):  # 点中了某个选中图元的矩形区域
                 if self.temp_pos is None:  # 起始点
                     self.temp_pos = [x, y]
-        self.updateScene([self.sceneRect()])
+        elif self.status == 'select':
+            self.select_origin = event.pos()
+            self.rubber_band.setGeometry(QRect(self.select_origin, self.select_origin))
+            self.rubber_band.show()
+        self.end_change(changed_item if changed_item is not None else self.temp_item, old_rect)
         super().mousePressEvent(event)
 
+    def paintEvent(self, event) -> None:
+        profiler = MyItem.profiler
+        if profiler is None:
+            super().paintEvent(event)
+            return
+        # 一次视口重绘为一帧，期间各图元的paint、光栅化和boundingRect计入该帧
+        start = profiler.begin()
+        super().paintEvent(event)
+        self.main_window.profile_label.setText(format_frame(profiler.end_frame(start)))
+
     def mouseMoveEvent(self, event: QMouseEvent) -> None:
+        profiler = MyItem.profiler
+        if profiler is not None:
+            start = profiler.begin()
         pos = self.mapToScene(event.localPos().toPoint())
         x = int(pos.x())
         y = int(pos.y())
+        changed_item = None
+        if self.status == 'translate':
+            if self.temp_pos is not None:
+                self.translate_selected(x, y)
+        elif self.status == 'select':
+            if self.select_origin is not None:
+                self.rubber_band.setGeometry(QRect(self.select_origin, event.pos()).normalized())
+        elif self.status in ('line', 'polygon', 'curve', 'circle', 'ellipse'):
+            changed_item = self.temp_item
+        old_rect = self.begin_change(changed_item)
         if self.status == 'line' and self.temp_item is not None:
             self.temp_item.p_list[1] = [x, y]
-        elif self.status == 'polygon' and self.temp_item is not None:
+        elif self.status in ('polygon', 'curve') and self.temp_item is not None:
             self.temp_item.p_list[-1] = [x, y]
         elif self.status == 'circle' and self.temp_item is not None:
             r = int(((y - self.temp_item.p_list[0][1]) ** 2 + (x - self.temp_item.p_list[0][0]) ** 2) ** (1 / 2))
@@ -171,15 +275,10 @@ class MyCanvas(QGraphicsView):
             rx = int(abs(x - self.temp_item.p_list[0][0]))
             ry = int(abs(y - self.temp_item.p_list[0][1]))
             self.temp_item.p_list[-1] = [rx,ry]
-
-        if self.status == 'translate':
-            if self.temp_pos is not None:  # 有起始点
-                self.item_dict[self.selected_id].offset[0] += x - self.temp_pos[0]
-                self.item_dict[self.selected_id].offset[1] += y - self.temp_pos[1]
-                self.temp_pos = [x, y]  # 注意！在每次更新后起始点都应变更，否则会产生重复计算
-                self.item_dict[self.selected_id].update()  # update paint
-        self.updateScene([self.sceneRect()])
+        self.end_change(changed_item, old_rect)
         super().mouseMoveEvent(event)
+        if profiler is not None:
+            profiler.end('mouseMove', start, status=self.status)
 
     def mouseReleaseEvent(self, event: QMouseEvent) -> None:
         """
@@ -194,17 +293,51 @@ class MyCanvas(QGraphicsView):
         y = int(pos.y())
         if self.status == 'translate':
             if self.temp_pos is not None:  # 有起始点
-                self.item_dict[self.selected_id].offset[0] += x - self.temp_pos[0]
-                self.item_dict[self.selected_id].offset[1] += y - self.temp_pos[1]
-                self.temp_pos = [x, y]
-                self.item_dict[self.selected_id].update()  # update paint
+                self.translate_selected(x, y)
                 self.temp_pos = None
+        elif self.status == 'select' and self.select_origin is not None:
+            self.rubber_band.hide()
+            band = QRect(self.select_origin, event.pos()).normalized()
+            self.select_origin = None
+            if band.width() < 3 and band.height() < 3:  # 视为点选，选中最上层的图元
+                self.select_items(self.index.query_point(x, y)[-1:])
+            else:
+                area = self.mapToScene(band).boundingRect()
+                self.select_items(self.index.query_rect((area.left(), area.top(), area.right(), area.bottom()),
+                                                        contain=True))
         super().mouseReleaseEvent(event)
 
+    def translate_selected(self, x, y):
+        """把所有选中图元从temp_pos平移到(x, y)"""
+        dx = x - self.temp_pos[0]
+        dy = y - self.temp_pos[1]
+        for item_id in self.selected_ids:
+            item = self.item_dict[item_id]
+            old_rect = self.begin_change(item)
+            item.offset[0] += dx
+            item.offset[1] += dy
+            self.end_change(item, old_rect)
+        self.temp_pos = [x, y]  # 注意！在每次更新后起始点都应变更，否则会产生重复计算
+
+    def load_store(self, store: SceneStore):
+        """清空画布并显示store中的所有图元，图元直接从store中读取参数"""
+        self.clear_paint()
+        self.store = store
+        for item_id in store:
+            item = MyItem(item_id, store.item_type(item_id), None, store.algorithm(item_id))
+            item.store = store
+            self.scene().addItem(item)
+            self.item_dict[item_id] = item
+            self.index.update(item_id, item_bounds(item))
+            self.list_widget.addItem(item_id)
+
     def clear_paint(self):
         self.scene().clear()
         self.item_dict.clear()
+        self.index.clear()
+        self.store.clear()
         self.selected_id = ''
+        self.selected_ids = []
         self.status = ''
         self.temp_algorithm = ''
         self.temp_id = ''
@@ -215,6 +348,11 @@ class MyItem(QGraphicsItem):
     """
     自定义图元类，继承自QGraphicsItem
     """
+    backend = alg  # 绘制后端，cg_algorithms或向量化的cg_algorithms_np，由主窗口菜单切换
+    render_mode = 'image'  # 'image'：光栅化到缓存图像后整体绘制；'point'：逐像素调用drawPoint
+    profiler = None  # 性能记录器cg_profile.Profiler，由主窗口菜单开启，None表示不记录
+    IMAGE_DENSITY = 8  # 包围盒面积超过画笔覆盖像素数的该倍数时（如长斜线）不缓存整幅图像，改为缓存水平像素段
+
     def __init__(self, item_id: str, item_type: str, p_list: list, algorithm: str = '', parent: QGraphicsItem = None,
                  mycolor: QColor = QColor(0, 0, 0)):
         """
@@ -226,71 +364,175 @@ class MyItem(QGraphicsItem):
         :param parent:
         """
         super().__init__(parent)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)  # paint时提供需要重绘的区域exposedRect
         self.id = item_id           # 图元ID
         self.item_type = item_type  # 图元类型，'line'、'polygon'、'ellipse'、'curve'等
-        self.p_list = p_list        # 图元参数
         self.algorithm = algorithm  # 绘制算法，'DDA'、'Bresenham'、'Bezier'、'B-spline'等
         self.selected = False
-        self.Pencolor = mycolor
-        self.offset = [0, 0]
+        self.store = None       # 绘制完成后图元的参数、颜色和平移量存放在画布的SceneStore中，见attach
+        self._p_list = p_list   # 绘制过程中的图元参数，鼠标事件直接修改其中的控制点
+        self._color = mycolor
+        self._offset = [0, 0]
+        self.pixel_key = None   # 像素缓存对应的(item_type, p_list, algorithm, 可见窗口)
+        self.pixel_cache = []   # 不含平移量offset的像素坐标列表
+        self.image_key = None   # 图像缓存对应的(pixel_key, 颜色)
+        self.image_cache = None  # (x, y, QImage)或水平像素段的QRect列表，坐标不含平移量
+
+    def attach(self, store: SceneStore):
+        """把绘制完成的图元存入store，之后p_list、Pencolor和offset都从store中读取"""
+        store.put(self.id, self.item_type, self._p_list, self.algorithm,
+                  (self._color.red(), self._color.green(), self._color.blue()))
+        store.offsets[store.rows[self.id]] = self._offset
+        self.store = store
+        self._p_list = None
+
+    @property
+    def p_list(self) -> list:
+        """图元参数（不含平移量）"""
+        if self.store is None:
+            return self._p_list
+        return self.store.p_list(self.id)
+
+    @p_list.setter
+    def p_list(self, p_list: list):
+        if self.store is None:
+            self._p_list = p_list
+        else:
+            self.store.set_points(self.id, p_list)
+
+    @property
+    def Pencolor(self) -> QColor:
+        if self.store is None:
+            return self._color
+        return QColor(*self.store.color(self.id).tolist())
+
+    @property
+    def offset(self):
+        """平移量[dx, dy]，存入store后为其中的一行，可原地修改"""
+        if self.store is None:
+            return self._offset
+        return self.store.offsets[self.store.rows[self.id]]
+
+    def local_bounds(self) -> tuple:
+        """不含平移量的包围盒(x_min, y_min, x_max, y_max)"""
+        return local_bounds(self.item_type, self.p_list)
+
+    def visible_window(self):
+        """场景矩形对应的像素窗口(x_min, y_min, x_max, y_max)，不含平移量；图元完全可见或不在场景中时返回None
+
+        宽度为2的画笔绘制点(x, y)时覆盖(x-1..x, y-1..y)，因此窗口右侧和下侧各包含场景外的一个像素
+        """
+        scene = self.scene()
+        if scene is None:
+            return None
+        rect = scene.sceneRect()
+        return visible_window(self.item_type, self.p_list, self.offset,
+                              (int(rect.left()), int(rect.top()), int(rect.width()), int(rect.height())))
+
+    def rasterize(self) -> list:
+        """返回图元的像素坐标列表（不含平移量），仅当类型、参数、算法或可见窗口变化时重新计算，见cg_headless.rasterize_item"""
+        window = self.visible_window()
+        key = (self.item_type, tuple(tuple(p) for p in self.p_list), self.algorithm, window)
+        if key == self.pixel_key:
+            return self.pixel_cache
+        if self.profiler is not None:
+            start = self.profiler.begin()
+        item_pixels = rasterize_item(self.backend, self.item_type, self.p_list, self.algorithm, window)
+        if not isinstance(item_pixels, list):  # NumPy后端返回数组
+            item_pixels = item_pixels.tolist()
+        self.pixel_key = key
+        self.pixel_cache = item_pixels
+        if self.profiler is not None:
+            self.profiler.end('rasterize', start, len(item_pixels), id=self.id, type=self.item_type,
+                              algorithm=self.algorithm)
+        return item_pixels
+
+    def render_image(self):
+        """返回图元的缓存图像(x, y, QImage)，仅当几何参数、算法或颜色变化时重新生成
+
+        宽度为2的画笔绘制点(x, y)时覆盖(x-1..x, y-1..y)四个像素，图像中按同样方式填充，
+        因此与逐点drawPoint的结果一致。包围盒相对像素数过大的稀疏图元返回覆盖像素的水平像素段（QRect列表），
+        使缓存占用的内存与像素数成正比，而不是与包围盒面积成正比
+        """
+        pixels = self.rasterize()
+        key = (self.pixel_key, self.Pencolor.rgba())
+        if key == self.image_key:
+            return self.image_cache
+        if self.profiler is not None:
+            start = self.profiler.begin()
+        self.image_key = key
+        if not pixels:
+            self.image_cache = None
+            return None
+        pixels = np.asarray(pixels, dtype=np.int64).reshape(-1, 2)
+        x_min, y_min = pixels.min(axis=0) - 1
+        x_max, y_max = pixels.max(axis=0)
+        if (x_max - x_min + 1) * (y_max - y_min + 1) > self.IMAGE_DENSITY * len(PEN_FOOTPRINT) * len(pixels):
+            self.image_cache = [QRect(x, y, length, 1) for x, y, length in footprint_runs(pixels).tolist()]
+            if self.profiler is not None:
+                self.profiler.end('render_image', start, id=self.id, runs=len(self.image_cache))
+            return self.image_cache
+        buffer = np.zeros((y_max - y_min + 1, x_max - x_min + 1), np.uint32)
+        xs = pixels[:, 0] - x_min
+        ys = pixels[:, 1] - y_min
+        color = self.Pencolor.rgba() | 0xFF000000  # 不透明颜色的预乘与非预乘ARGB相同
+        for dx, dy in PEN_FOOTPRINT:
+            buffer[ys + dy, xs + dx] = color
+        h, w = buffer.shape
+        image = QImage(buffer.data, w, h, 4 * w, QImage.Format_ARGB32_Premultiplied).copy()
+        self.image_cache = (int(x_min), int(y_min), image)
+        if self.profiler is not None:
+            self.profiler.end('render_image', start, id=self.id, width=w, height=h)
+        return self.image_cache
 
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = ...) -> None:
         # 自己的tips：在item调用update时，图元会自动再次调用paint函数，此时selected项就有意义了
+        if self.profiler is not None:
+            start = self.profiler.begin()
         pen = QPen(self.Pencolor, 2)  # 画笔颜色/字体大小
         painter.setPen(pen)
-        item_pixels = None
-        if self.item_type == 'line':
-            item_pixels = alg.draw_line(self.p_list, self.algorithm)
-        elif self.item_type == 'polygon':
-            item_pixels = alg.draw_polygon(self.p_list, self.algorithm)
-        elif self.item_type == 'circle':
-            item_pixels = alg.draw_circle(self.p_list, self.algorithm)
-        elif self.item_type == 'ellipse':
-            item_pixels = alg.draw_ellipse(self.p_list)
-        elif self.item_type == 'curve':
-            item_pixels = alg.draw_curve(self.p_list, self.algorithm)
-        for i in item_pixels:
-            p = [i[0], i[1]]
-            p[0] += self.offset[0]
-            p[1] += self.offset[1]
-            painter.drawPoint(*p)
+        # 缓存的像素不含平移量，平移通过坐标系偏移实现，拖动时无需重新光栅化
+        painter.translate(self.offset[0], self.offset[1])
+        if self.render_mode == 'image':
+            image = self.render_image()
+            if isinstance(image, list):  # 稀疏图元的水平像素段
+                painter.setPen(Qt.NoPen)
+                painter.setBrush(self.Pencolor)
+                painter.drawRects(image)
+                painter.setBrush(Qt.NoBrush)
+            elif image is not None:
+                painter.drawImage(image[0], image[1], image[2])
+        else:
+            pixels = self.rasterize()
+            if pixels:
+                # 只绘制需要重绘的区域内的点，点(x, y)覆盖(x-1..x, y-1..y)
+                area = option.exposedRect.translated(-self.offset[0], -self.offset[1])
+                pixels = np.asarray(pixels).reshape(-1, 2)
+                x, y = pixels[:, 0], pixels[:, 1]
+                inside = (x >= area.left()) & (x - 1 <= area.right()) & (y >= area.top()) & (y - 1 <= area.bottom())
+                for p in pixels[inside].tolist():
+                    painter.drawPoint(*p)
+        painter.translate(-self.offset[0], -self.offset[1])
         if self.selected:
             painter.setPen(QColor(255, 0, 0))
             painter.drawRect(self.boundingRect())
+        if self.profiler is not None:
+            self.profiler.end('paint', start, id=self.id)
 
     def boundingRect(self) -> QRectF:  # 返回该项目所绘制区域的估计值
-        x, y, w, h = None, None, None, None
-        if self.item_type == 'line':
-            x0, y0 = self.p_list[0]
-            x1, y1 = self.p_list[1]
-            x = min(x0, x1)
-            y = min(y0, y1)
-            w = max(x0, x1) - x
-            h = max(y0, y1) - y
-        elif self.item_type == 'polygon':
-            x_list = []
-            y_list = []
-            for i in self.p_list:
-                x_list += [i[0]]
-                y_list += [i[1]]
-            x = min(x_list)
-            y = min(y_list)
-            w = max(x_list) - x
-            h = max(y_list) - y
-        elif self.item_type == 'circle':
-            x = self.p_list[0][0]-self.p_list[1][1]
-            y = self.p_list[0][1]-self.p_list[1][1]
-            w = 2 * self.p_list[1][1]
-            h = 2 * self.p_list[1][1]
-        elif self.item_type == 'ellipse':
-            x = self.p_list[0][0] - self.p_list[1][0]
-            y = self.p_list[0][1] - self.p_list[1][1]
-            w = 2 * self.p_list[1][0]
-            h = 2 * self.p_list[1][1]
-        elif self.item_type == 'curve':
-            pass
-
-        return QRectF(x - 1 + self.offset[0], y - 1 + self.offset[1], w + 2, h + 2)
+        if self.profiler is not None:
+            start = self.profiler.begin()
+        x, y, w, h = item_rect(self.item_type, self.p_list)
+        rect = QRectF(x - 1 + self.offset[0], y - 1 + self.offset[1], w + 2, h + 2)
+        if self.profiler is not None:
+            self.profiler.add('boundingRect', start)  # 调用过于频繁，只计入帧统计
+        return rect
+
+
+def item_bounds(item: QGraphicsItem) -> tuple:
+    """图元包围盒的(x_min, y_min, x_max, y_max)表示，用于空间索引"""
+    rect = item.boundingRect()
+    return rect.left(), rect.top(), rect.right(), rect.bottom()
 
 
 class MainWindow(QMainWindow):
@@ -318,6 +560,27 @@ class MainWindow(QMainWindow):
         file_menu = menubar.addMenu('文件')
         set_pen_act = file_menu.addAction('设置画笔')
         reset_canvas_act = file_menu.addAction('重置画布')
+        save_scene_act = file_menu.addAction('保存场景')
+        load_scene_act = file_menu.addAction('打开场景')
+        backend_menu = file_menu.addMenu('绘制后端')
+        backend_python_act = backend_menu.addAction('Python')
+        backend_numpy_act = backend_menu.addAction('NumPy')
+        backend_group = QActionGroup(self)
+        for act in (backend_python_act, backend_numpy_act):
+            act.setCheckable(True)
+            backend_group.addAction(act)
+        backend_python_act.setChecked(True)
+        render_menu = file_menu.addMenu('渲染方式')
+        render_image_act = render_menu.addAction('图像缓存')
+        render_point_act = render_menu.addAction('逐点绘制')
+        render_group = QActionGroup(self)
+        for act in (render_image_act, render_point_act):
+            act.setCheckable(True)
+            render_group.addAction(act)
+        render_image_act.setChecked(True)
+        profile_act = file_menu.addAction('性能分析')
+        profile_act.setCheckable(True)
+        save_profile_act = file_menu.addAction('导出性能记录')
         exit_act = file_menu.addAction('退出')
         draw_menu = menubar.addMenu('绘制')
         line_menu = draw_menu.addMenu('线段')
@@ -327,12 +590,14 @@ class MainWindow(QMainWindow):
         polygon_menu = draw_menu.addMenu('多边形')
         polygon_dda_act = polygon_menu.addAction('DDA')
         polygon_bresenham_act = polygon_menu.addAction('Bresenham')
+        polygon_scanline_act = polygon_menu.addAction('扫描线填充')
         circle_act = draw_menu.addAction('圆')
         ellipse_act = draw_menu.addAction('椭圆')
         curve_menu = draw_menu.addMenu('曲线')
         curve_bezier_act = curve_menu.addAction('Bezier')
         curve_b_spline_act = curve_menu.addAction('B-spline')
         edit_menu = menubar.addMenu('编辑')
+        select_act = edit_menu.addAction('选择')
         translate_act = edit_menu.addAction('平移')
         rotate_act = edit_menu.addAction('旋转')
         scale_act = edit_menu.addAction('缩放')
@@ -343,19 +608,29 @@ class MainWindow(QMainWindow):
         # 连接信号和槽函数
         set_pen_act.triggered.connect(self.set_pen_action)
         reset_canvas_act.triggered.connect(self.reset_canvas_action)
+        save_scene_act.triggered.connect(self.save_scene_action)
+        load_scene_act.triggered.connect(self.load_scene_action)
         exit_act.triggered.connect(qApp.quit)
+        backend_python_act.triggered.connect(self.backend_python_action)
+        backend_numpy_act.triggered.connect(self.backend_numpy_action)
+        render_image_act.triggered.connect(self.render_image_action)
+        render_point_act.triggered.connect(self.render_point_action)
+        profile_act.triggered.connect(self.profile_action)
+        save_profile_act.triggered.connect(self.save_profile_action)
 
         line_naive_act.triggered.connect(self.line_naive_action)
         line_dda_act.triggered.connect(self.line_dda_action)
         line_bresenham_act.triggered.connect(self.line_bresenham_action)
         polygon_dda_act.triggered.connect(self.polygon_dda_action)
         polygon_bresenham_act.triggered.connect(self.polygon_bresenham_action)
+        polygon_scanline_act.triggered.connect(self.polygon_scanline_action)
 
         circle_act.triggered.connect(self.circle_action)
         ellipse_act.triggered.connect(self.ellipse_action)
         curve_bezier_act.triggered.connect(self.curve_bezier_action)
         curve_b_spline_act.triggered.connect(self.curve_b_spline_action)
 
+        select_act.triggered.connect(self.select_action)
         translate_act.triggered.connect(self.translate_action)
 
 
@@ -369,6 +644,10 @@ class MainWindow(QMainWindow):
         self.central_widget.setLayout(self.hbox_layout)
         self.setCentralWidget(self.central_widget)
         self.statusBar().showMessage('空闲')
+        self.profiler = None  # 最近一次开启的性能记录器，关闭记录后仍可导出
+        self.profile_label = QLabel()  # 开启性能分析时在状态栏右侧显示上一帧的统计
+        self.statusBar().addPermanentWidget(self.profile_label)
+        self.profile_label.hide()
         self.resize(600, 600)
         self.setWindowTitle('CG Demo')
 
@@ -438,6 +717,77 @@ class MainWindow(QMainWindow):
             if h > self.height():
                 self.resize(self.width(), h)
 
+    def save_scene_action(self):
+        path, _ = QFileDialog.getSaveFileName(self, '保存场景', '', '场景文件 (*.cgs)')
+        if not path:
+            return
+        rect = self.scene.sceneRect()
+        self.canvas_widget.store.save(path, 'gui', {'width': int(rect.width()), 'height': int(rect.height())})
+        self.statusBar().showMessage('场景已保存：%s' % path)
+
+    def load_scene_action(self):
+        path, _ = QFileDialog.getOpenFileName(self, '打开场景', '', '场景文件 (*.cgs)')
+        if not path:
+            return
+        try:
+            store, meta = SceneStore.load(path, 'gui')
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, '打开场景', str(e))
+            return
+        self.list_widget.clear()
+        w, h = meta.get('width', 600), meta.get('height', 600)
+        self.scene.setSceneRect(0, 0, w, h)
+        self.canvas_widget.setFixedSize(w, h)
+        self.canvas_widget.load_store(store)
+        # 新图元的id接在已有的数字id之后
+        self.item_cnt = max([int(item_id) for item_id in store if item_id.isdigit()], default=0) + 1
+        self.canvas_widget.temp_id = str(self.item_cnt)
+        self.statusBar().showMessage('场景已打开：%s（%d个图元）' % (path, len(store)))
+
+    def backend_python_action(self):
+        MyItem.backend = alg
+        self.statusBar().showMessage('绘制后端：Python')
+        self.canvas_widget.updateScene([self.canvas_widget.sceneRect()])
+
+    def backend_numpy_action(self):
+        import cg_algorithms_np
+        MyItem.backend = cg_algorithms_np
+        self.statusBar().showMessage('绘制后端：NumPy')
+        self.canvas_widget.updateScene([self.canvas_widget.sceneRect()])
+
+    def render_image_action(self):
+        MyItem.render_mode = 'image'
+        self.statusBar().showMessage('渲染方式：图像缓存')
+        self.canvas_widget.updateScene([self.canvas_widget.sceneRect()])
+
+    def render_point_action(self):
+        MyItem.render_mode = 'point'
+        self.statusBar().showMessage('渲染方式：逐点绘制')
+        self.canvas_widget.updateScene([self.canvas_widget.sceneRect()])
+
+    def profile_action(self, checked: bool):
+        if checked:
+            self.profiler = Profiler()
+            MyItem.profiler = self.profiler
+            self.profile_label.setText('')
+            self.profile_label.show()
+            self.statusBar().showMessage('性能分析已开启')
+        else:
+            MyItem.profiler = None
+            self.profile_label.hide()
+            self.statusBar().showMessage('性能分析已关闭')
+        self.canvas_widget.updateScene([self.canvas_widget.sceneRect()])
+
+    def save_profile_action(self):
+        if self.profiler is None:
+            QMessageBox.information(self, '导出性能记录', '请先开启性能分析')
+            return
+        path, _ = QFileDialog.getSaveFileName(self, '导出性能记录', '', 'Chrome trace (*.json)')
+        if not path:
+            return
+        self.profiler.save(path)
+        self.statusBar().showMessage('性能记录已导出：%s（%d帧）' % (path, self.profiler.frames))
+
     def line_naive_action(self):
         self.canvas_widget.start_draw_line('Naive', str(self.item_cnt))
         self.statusBar().showMessage('Naive算法绘制线段')
@@ -468,6 +818,12 @@ class MainWindow(QMainWindow):
         self.list_widget.clearSelection()
         self.canvas_widget.clear_selection()
 
+    def polygon_scanline_action(self):
+        self.canvas_widget.start_draw_polygon('Scanline', str(self.item_cnt))
+        self.statusBar().showMessage('扫描线算法填充多边形')
+        self.list_widget.clearSelection()
+        self.canvas_widget.clear_selection()
+
     def circle_action(self):
         self.canvas_widget.start_draw_circle('Circle', str(self.item_cnt))
         self.statusBar().showMessage('绘制圆形')
@@ -481,10 +837,20 @@ class MainWindow(QMainWindow):
         self.canvas_widget.clear_selection()
 
     def curve_bezier_action(self):
-        pass
+        self.canvas_widget.start_draw_curve('Bezier', str(self.item_cnt))
+        self.statusBar().showMessage('Bezier曲线：左键添加控制点，右键结束')
+        self.list_widget.clearSelection()
+        self.canvas_widget.clear_selection()
 
     def curve_b_spline_action(self):
-        pass
+        self.canvas_widget.start_draw_curve('B-spline', str(self.item_cnt))
+        self.statusBar().showMessage('B样条曲线：左键添加控制点，右键结束')
+        self.list_widget.clearSelection()
+        self.canvas_widget.clear_selection()
+
+    def select_action(self):
+        self.canvas_widget.start_select()
+        self.statusBar().showMessage('选择图元：点击选中最上层图元，拖动框选区域内的图元')
 
     def translate_action(self):
         QMessageBox.information(self,"平移功能提示","请先选中图元对应id，\n之后点击选中区域即可拖动进行平移",QMessageBox.Yes|QMessageBox.No)
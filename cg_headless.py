@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 图形界面场景的无界面渲染：cg_gui中MyItem的光栅化规则在此实现，不导入PyQt5，
+# 可在没有显示服务的机器上把图形界面保存的场景批量绘制为图像，结果与界面中paint绘制的一致
+
+import os
+import sys
+import argparse
+import numpy as np
+from cg_scene import SceneStore
+from cg_cli import BACKENDS, load_backend, as_pixel_view, save_image
+
+# 宽度为2的画笔绘制点(x, y)时覆盖的四个像素相对(x, y)的偏移
+PEN_FOOTPRINT = ((0, 0), (-1, 0), (0, -1), (-1, -1))
+
+
+def item_rect(item_type, p_list):
+    """图元控制点的包围盒(x, y, w, h)，不含平移量和画笔宽度；椭圆和圆的p_list为[[中心], [半轴]]"""
+    if item_type == 'circle':
+        (cx, cy), (_, r) = p_list
+        return cx - r, cy - r, 2 * r, 2 * r
+    if item_type == 'ellipse':
+        (cx, cy), (rx, ry) = p_list
+        return cx - rx, cy - ry, 2 * rx, 2 * ry
+    # 线段的两个端点、多边形的顶点；曲线位于控制点的凸包内
+    xs = [p[0] for p in p_list]
+    ys = [p[1] for p in p_list]
+    return min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+
+
+def local_bounds(item_type, p_list):
+    """与MyItem.boundingRect一致的包围盒(x_min, y_min, x_max, y_max)，不含平移量，四周各留1像素画笔宽度"""
+    x, y, w, h = item_rect(item_type, p_list)
+    return x - 1, y - 1, x + w + 1, y + h + 1
+
+
+def visible_window(item_type, p_list, offset, scene_rect):
+    """场景矩形对应的像素窗口(x_min, y_min, x_max, y_max)，不含平移量；图元完全可见时返回None
+
+    :param offset: (tuple of int: (dx, dy)) 图元的平移量
+    :param scene_rect: (tuple of int: (x, y, w, h)) 场景矩形；与QRectF一致，右边界和下边界为x + w、y + h
+    """
+    dx, dy = offset
+    x, y, w, h = scene_rect
+    window = (x - dx, y - dy, x + w - dx, y + h - dy)
+    x_min, y_min, x_max, y_max = local_bounds(item_type, p_list)
+    if window[0] <= x_min and window[1] <= y_min and x_max <= window[2] and y_max <= window[3]:
+        return None
+    return window
+
+
+def rasterize_item(backend, item_type, p_list, algorithm, window=None):
+    """图元的像素坐标，不含平移量
+
+    部分位于场景外的图元只光栅化window内的部分：线段和多边形在光栅化前裁剪，其余图元去掉窗口外的像素
+
+    :param backend: 绘制后端，cg_algorithms或cg_algorithms_np
+    :param window: (tuple of int: (x_min, y_min, x_max, y_max)) 见visible_window，None表示不裁剪
+    :return: (list of list of int或numpy.ndarray) 像素坐标，类型取决于后端
+    """
+    if item_type == 'line':
+        return backend.draw_lines([p_list], algorithm, window)[0]
+    if item_type == 'polygon':
+        return backend.draw_polygon(p_list, algorithm, window)
+    if item_type not in ('circle', 'ellipse', 'curve'):
+        raise ValueError('unknown item type %r' % (item_type,))
+    x_min, y_min, x_max, y_max = local_bounds(item_type, p_list)
+    if window is not None and not backend.overlaps([[x_min, y_min], [x_max, y_max]], window):
+        return []
+    pixels = []
+    if item_type == 'circle':
+        pixels = backend.draw_circle(p_list, algorithm)
+    elif item_type == 'ellipse':
+        pixels = backend.draw_ellipse(p_list)
+    elif item_type == 'curve':
+        pixels = backend.draw_curve(p_list, algorithm)
+    if window is not None and len(pixels):
+        pixels = backend.crop(pixels, window)
+    return pixels
+
+
+def footprint_runs(pixels):
+    """宽度为2的画笔绘制pixels时覆盖的像素，合并为水平像素段
+
+    :param pixels: (numpy.ndarray of int, shape (N, 2)) 像素坐标
+    :return: (numpy.ndarray of int64, shape (R, 3)) 各像素段(x, y, 长度)，按y、x递增排列，互不重叠
+    """
+    covered = np.concatenate([pixels + offset for offset in PEN_FOOTPRINT])
+    covered = np.unique(covered[:, 1] * (1 << 32) + (covered[:, 0] + (1 << 31)))  # 按(y, x)排序并去重
+    ys, xs = covered >> 32, (covered & 0xFFFFFFFF) - (1 << 31)
+    start = np.flatnonzero(np.r_[True, (ys[1:] != ys[:-1]) | (xs[1:] != xs[:-1] + 1)])
+    lengths = np.diff(np.r_[start, len(xs)])
+    return np.stack([xs[start], ys[start], lengths], axis=1)
+
+
+def render_scene(store, width, height, backend=None):
+    """按z序把store中的图元绘制到width×height的白色画布上，与图形界面中各图元paint的结果一致（不绘制选中框）
+
+    :param store: (cg_scene.SceneStore) 图形界面的场景，椭圆和圆的控制点为中心和半轴
+    :param backend: 绘制后端，默认为cg_algorithms
+    :return: (numpy.ndarray of uint8, shape (height, width, 3)) RGB画布，像素(x, y)位于canvas[y, x]
+    """
+    if backend is None:
+        backend = load_backend('python')
+    canvas = np.full((height, width, 3), 255, np.uint8)
+    view = as_pixel_view(canvas)
+    rows = store.live_rows()
+    # 界面中先光栅化不含平移量的参数，再整体平移
+    for row, (item_type, p_list, algorithm, color) in zip(rows.tolist(), store.items(rows, offset=False)):
+        dx, dy = store.offsets[row].tolist()
+        pixels = rasterize_item(backend, item_type, p_list, algorithm,
+                                visible_window(item_type, p_list, (dx, dy), (0, 0, width, height)))
+        pixels = np.asarray(pixels, dtype=np.int64).reshape(-1, 2) + (dx, dy)
+        color = as_pixel_view(color)
+        for ox, oy in PEN_FOOTPRINT:
+            x, y = pixels[:, 0] + ox, pixels[:, 1] + oy
+            inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+            view[y[inside], x[inside]] = color
+    return canvas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='把图形界面保存的场景文件绘制为BMP图像，不需要显示服务')
+    parser.add_argument('scenes', nargs='+', help='场景文件（.cgs），见图形界面的“保存场景”')
+    parser.add_argument('output_dir')
+    parser.add_argument('--backend', choices=BACKENDS, default='python', help='绘制后端')
+    args = parser.parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    backend = load_backend(args.backend)
+    for path in args.scenes:
+        store, meta = SceneStore.load(path, 'gui')
+        canvas = render_scene(store, meta.get('width', 600), meta.get('height', 600), backend)
+        name = os.path.splitext(os.path.basename(path))[0]
+        save_image(canvas, os.path.join(args.output_dir, name + '.bmp'))
+        print('%s -> %s.bmp（%d个图元）' % (path, name, len(store)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
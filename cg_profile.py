@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 图形界面的性能记录：按帧汇总各热点的调用次数和耗时，并可导出为Chrome trace JSON（chrome://tracing、Perfetto），不依赖Qt
+
+import os
+import json
+import time
+from collections import deque
+
+
+class Profiler:
+    """按帧汇总的性能记录器
+
+    被测代码用begin取得开始时间，结束时调用end（记录一个trace事件并计入本帧统计）或add（只计入本帧统计，
+    用于boundingRect这类调用频繁、逐次记录事件代价过高的热点）；end_frame结束一帧，返回本帧的统计并清零。
+    未开启记录时调用方不持有Profiler（见cg_gui.MyItem.profiler），热点处只多一次属性判断
+    """
+    def __init__(self, max_events: int = 200000):
+        """
+        :param max_events: (int) 最多保留的trace事件数，超出后丢弃最早的事件
+        """
+        self.events = deque(maxlen=max_events)
+        self.origin = time.perf_counter()
+        self.totals = {}  # 热点名 -> [本帧调用次数, 本帧总耗时（秒）]
+        self.pixels = 0   # 本帧光栅化的像素数
+        self.frames = 0
+
+    begin = staticmethod(time.perf_counter)
+
+    def add(self, name: str, start: float, pixels: int = 0) -> float:
+        """把从start开始的一次调用计入本帧统计，返回结束时间"""
+        now = time.perf_counter()
+        total = self.totals.get(name)
+        if total is None:
+            self.totals[name] = [1, now - start]
+        else:
+            total[0] += 1
+            total[1] += now - start
+        self.pixels += pixels
+        return now
+
+    def end(self, name: str, start: float, pixels: int = 0, **args):
+        """计入本帧统计，并记录一个从start开始的trace事件，args为事件附带的参数
+
+        :param pixels: (int) 本次调用光栅化的像素数，计入本帧统计和事件参数
+        """
+        now = self.add(name, start, pixels)
+        if pixels:
+            args['pixels'] = pixels
+        self.events.append({'name': name, 'ph': 'X', 'ts': (start - self.origin) * 1e6,
+                            'dur': (now - start) * 1e6, 'pid': os.getpid(), 'tid': 0, 'args': args})
+
+    def end_frame(self, start: float) -> dict:
+        """结束从start开始的一帧，返回本帧统计{'frame': 帧耗时（秒）, 'pixels': 像素数, 热点名: (次数, 耗时), ...}"""
+        self.frames += 1
+        stats = {name: tuple(total) for name, total in self.totals.items()}
+        stats['pixels'] = self.pixels
+        self.end('frame', start, frame=self.frames, pixels=self.pixels,
+                 **{name: count for name, (count, _) in self.totals.items()})
+        stats['frame'] = self.events[-1]['dur'] / 1e6
+        self.totals = {}
+        self.pixels = 0
+        return stats
+
+    def save(self, path: str):
+        """把记录的事件保存为Chrome trace JSON"""
+        with open(path, 'w') as fp:
+            json.dump({'traceEvents': list(self.events), 'displayTimeUnit': 'ms'}, fp)
+
+
+def format_frame(stats: dict) -> str:
+    """把end_frame返回的统计格式化为一行文字，用于状态栏"""
+    parts = ['帧 %.1fms' % (1000 * stats['frame'])]
+    for name, value in stats.items():
+        if name not in ('frame', 'pixels'):
+            parts.append('%s %d次/%.1fms' % (name, value[0], 1000 * value[1]))
+    if stats['pixels']:
+        parts.append('%d像素' % stats['pixels'])
+    return ' | '.join(parts)
@@ -0,0 +1,435 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 按列存放的场景：图元类型、算法、颜色和控制点都放在连续的NumPy数组中，由cg_cli和cg_gui共用，不依赖Qt
+import json
+import numpy as np
+from cg_algorithms import LINE_MARGIN
+
+SCENE_MAGIC = b'CGSCENE\0'
+SCENE_VERSION = 1
+SCENE_ALIGN = 64  # 场景文件中各数组起始位置的对齐字节数
+# 坐标约定 -> 允许的图元类型。'gui'（cg_gui）：y轴向下，椭圆为[[中心], [半轴]]，圆为[[圆心], [0, 半径]]；
+# 'cli'（cg_cli）：y轴向上，椭圆为外接矩形的两个角点，没有圆
+SCENE_COORDS = {
+    'gui': ('line', 'polygon', 'circle', 'ellipse', 'curve'),
+    'cli': ('line', 'polygon', 'ellipse', 'curve'),
+}
+RADIUS_TYPES = ('circle', 'ellipse')  # 图形界面中第二个控制点为半轴、平移时不变的图元类型
+
+
+class SceneStore:
+    """列式场景存储
+
+    每个图元占一行：类型编码、算法编码、RGB颜色、平移量，以及控制点在points中的起始位置和数量；
+    所有图元的控制点首尾相接存放在一个(M, 2)的int32数组中。行号即z序，越大越靠上层：
+    重复放入已有id时沿用原来的行，删除的行只做标记，直到clear才回收，因此行号在场景的生命周期内保持不变。
+    控制点数量改变或图元删除时，旧的控制点成为空洞，空洞超过一半时压缩points
+
+    控制点坐标须在int32范围内；图元id不能包含换行符
+
+    场景可用save保存为二进制文件，load时各数组以写时复制方式映射文件，id在第一次按id访问时才解码
+    """
+    def __init__(self):
+        self._ids = []         # 行号 -> 图元id
+        self._rows = {}        # 图元id -> 行号
+        self._id_blob = None   # 尚未解码的id：以换行符分隔的UTF-8字节
+        self.count = 0         # 未删除的图元数
+        self.type_names = []   # 类型编码 -> 类型名，按首次出现的顺序编码
+        self.type_codes = {}
+        self.algorithm_names = []
+        self.algorithm_codes = {}
+        self.size = 0          # 已使用的行数（包括删除的行）
+        self.types = np.zeros(0, np.int8)
+        self.algorithms = np.zeros(0, np.int8)
+        self.colors = np.zeros((0, 3), np.uint8)
+        self.offsets = np.zeros((0, 2), np.int32)  # 绘制时附加的平移量，GUI拖动平移时不修改控制点；命令行不使用
+        self.starts = np.zeros(0, np.int64)
+        self.counts = np.zeros(0, np.int32)
+        self.alive = np.zeros(0, bool)
+        self.points = np.zeros((0, 2), np.int32)
+        self.n_points = 0      # points中已使用的行数（包括空洞）
+        self.holes = 0         # points中空洞的行数
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def ids(self):
+        if self._id_blob is not None:
+            self._decode_ids()
+        return self._ids
+
+    @property
+    def rows(self):
+        if self._id_blob is not None:
+            self._decode_ids()
+        return self._rows
+
+    def _decode_ids(self):
+        blob = self._id_blob
+        self._id_blob = None
+        self._ids = bytes(blob).decode('utf-8').split('\n') if self.size else []
+        self._rows = dict(zip(self._ids, range(self.size)))
+
+    def __contains__(self, item_id):
+        return item_id in self.rows
+
+    def __iter__(self):
+        """按z序给出所有图元的id"""
+        return (self.ids[row] for row in self.live_rows().tolist())
+
+    def clear(self):
+        self.__init__()
+
+    @staticmethod
+    def _encode(name, names, codes):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def _reserve_rows(self, n):
+        if n <= len(self.types):
+            return
+        size = max(n, 2 * len(self.types), 16)
+        self.types = np.resize(self.types, size)
+        self.algorithms = np.resize(self.algorithms, size)
+        self.colors = np.resize(self.colors, (size, 3))
+        self.offsets = np.resize(self.offsets, (size, 2))
+        self.starts = np.resize(self.starts, size)
+        self.counts = np.resize(self.counts, size)
+        self.alive = np.concatenate([self.alive[:self.size], np.zeros(size - self.size, bool)])
+
+    def _reserve_points(self, n):
+        if n <= len(self.points):
+            return
+        self.points = np.resize(self.points, (max(n, 2 * len(self.points), 64), 2))
+
+    def put(self, item_id, item_type, p_list, algorithm, color):
+        """放入图元；id已存在时替换其内容，z序不变
+
+        :param p_list: (list of list of int 或 array-like, shape (n, 2)) 控制点
+        :param color: (array-like of int: [r, g, b]) 颜色
+        :return: (int) 图元所在的行
+        """
+        row = self.rows.get(item_id)
+        if row is None:
+            row = self.size
+            self._reserve_rows(row + 1)
+            self.size += 1
+            self.rows[item_id] = row
+            self.ids.append(item_id)
+            self.count += 1
+            self.starts[row] = 0
+            self.counts[row] = 0
+            self.offsets[row] = 0
+            self.alive[row] = True
+        self.types[row] = self._encode(item_type, self.type_names, self.type_codes)
+        self.algorithms[row] = self._encode(algorithm, self.algorithm_names, self.algorithm_codes)
+        self.colors[row] = color
+        self.set_points(item_id, p_list)
+        return row
+
+    def remove(self, item_id):
+        row = self.rows.pop(item_id)
+        self.alive[row] = False
+        self.count -= 1
+        self.holes += int(self.counts[row])
+        self.counts[row] = 0
+        self._maybe_compact()
+
+    def set_points(self, item_id, p_list):
+        """替换图元的控制点；数量不变时原地覆盖，否则追加到points末尾"""
+        row = self.rows[item_id]
+        p = np.asarray(p_list, dtype=np.int64).reshape(-1, 2)
+        count = int(self.counts[row])
+        if len(p) != count:
+            self.holes += count
+            self._reserve_points(self.n_points + len(p))
+            self.starts[row] = self.n_points
+            self.counts[row] = len(p)
+            self.n_points += len(p)
+        start = int(self.starts[row])
+        self.points[start:start + len(p)] = p
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self.holes > 64 and self.holes * 2 > self.n_points:
+            self.compact()
+
+    def compact(self):
+        """去掉points中的空洞，行号不变"""
+        rows = self.live_rows()
+        counts = self.counts[rows].astype(np.int64)
+        self.points = self.points[self.point_index(rows)]
+        self.starts[rows] = np.cumsum(counts) - counts
+        self.n_points = len(self.points)
+        self.holes = 0
+
+    def live_rows(self):
+        """未删除的行，按z序排列"""
+        return np.flatnonzero(self.alive[:self.size])
+
+    def row_of(self, item_ids):
+        return np.fromiter((self.rows[item_id] for item_id in item_ids), np.int64, len(item_ids))
+
+    def point_index(self, rows):
+        """rows中各行的控制点在points中的下标，首尾相接"""
+        counts = self.counts[rows].astype(np.int64)
+        ends = np.cumsum(counts)
+        return np.arange(ends[-1] if len(ends) else 0) + np.repeat(self.starts[rows] - (ends - counts), counts)
+
+    def item_type(self, item_id):
+        return self.type_names[self.types[self.rows[item_id]]]
+
+    def algorithm(self, item_id):
+        return self.algorithm_names[self.algorithms[self.rows[item_id]]]
+
+    def color(self, item_id):
+        return self.colors[self.rows[item_id]]
+
+    def p_list(self, item_id, offset=False):
+        """图元控制点的列表表示[[x0, y0], [x1, y1], ...]
+
+        :param offset: (bool) 为True时加上平移量，见items
+        """
+        row = self.rows[item_id]
+        start = int(self.starts[row])
+        p = self.points[start:start + self.counts[row]]
+        if offset:
+            p = p + self._point_offsets(np.array([row]))
+        return p.tolist()
+
+    def _point_offsets(self, rows):
+        """rows中各图元的每个控制点应加的平移量，(M, 2)数组，与point_index(rows)一一对应
+
+        圆和椭圆（RADIUS_TYPES）只平移中心，第二个控制点是半轴，不加平移量
+        """
+        counts = self.counts[rows]
+        result = np.repeat(self.offsets[rows], counts, axis=0)
+        radius = np.isin(self.types[rows], [self.type_codes[name] for name in RADIUS_TYPES if name in self.type_codes])
+        if radius.any():
+            first = np.cumsum(counts) - counts
+            result[first[radius & (counts > 1)] + 1] = 0
+        return result
+
+    def get(self, item_id):
+        """[item_type, p_list, algorithm, color]，p_list加上了平移量，见items"""
+        row = self.rows[item_id]
+        return [self.type_names[self.types[row]], self.p_list(item_id, True),
+                self.algorithm_names[self.algorithms[row]], self.colors[row]]
+
+    def items(self, rows=None, offset=True):
+        """按rows的顺序给出[(item_type, p_list, algorithm, color), ...]，color为(3,)的uint8数组
+
+        :param rows: (array-like of int) 行号，None表示按z序的所有图元
+        :param offset: (bool) 为True时p_list加上平移量；圆和椭圆只平移中心，半轴不变
+        """
+        if rows is None:
+            rows = self.live_rows()
+        rows = np.asarray(rows, dtype=np.int64)
+        counts = self.counts[rows]
+        points = self.points[self.point_index(rows)]
+        if offset:
+            points = points + self._point_offsets(rows)
+        points = points.tolist()
+        types, algorithms = self.types[rows].tolist(), self.algorithms[rows].tolist()
+        start = 0
+        for k, count in enumerate(counts.tolist()):
+            yield (self.type_names[types[k]], points[start:start + count],
+                   self.algorithm_names[algorithms[k]], self.colors[rows[k]])
+            start += count
+
+    def transform(self, item_ids, matrices):
+        """对各图元的控制点分别应用3×3仿射矩阵，所有控制点一次向量化计算，结果与cg_algorithms.transform_items一致
+
+        :param item_ids: (list) 图元id
+        :param matrices: (array-like of float, shape (N, 3, 3)) 各图元的仿射矩阵
+        """
+        if not len(item_ids):
+            return
+        rows = self.row_of(item_ids)
+        index = self.point_index(rows)
+        m = np.repeat(np.asarray(matrices, dtype=np.float64)[:, :2, :], self.counts[rows], axis=0)
+        x, y = self.points[index, 0].astype(np.float64), self.points[index, 1].astype(np.float64)
+        # 与cg_algorithms.transform相同的运算顺序；np.rint与round同为四舍六入五成双
+        self.points[index, 0] = np.rint(m[:, 0, 0] * x + m[:, 0, 1] * y + m[:, 0, 2])
+        self.points[index, 1] = np.rint(m[:, 1, 0] * x + m[:, 1, 1] * y + m[:, 1, 2])
+
+    def translate(self, item_ids, dx, dy):
+        """增加图元的平移量，不修改控制点"""
+        self.offsets[self.row_of(item_ids)] += [dx, dy]
+
+    def bounds(self, rows=None):
+        """各行图元像素的包围盒，(N, 4)的int64数组，每行为(x_min, y_min, x_max, y_max)
+
+        椭圆的控制点为外接矩形的两个角点，曲线位于控制点的凸包内，
+        各类图元的像素都不超出控制点（含平移量）的包围盒四周放宽cg_algorithms.LINE_MARGIN后的范围。
+        没有控制点的行记为(0, 0, -1, -1)
+        """
+        if rows is None:
+            rows = self.live_rows()
+        rows = np.asarray(rows, dtype=np.int64)
+        counts = self.counts[rows]
+        result = np.tile(np.array([0, 0, -1, -1], np.int64), (len(rows), 1))
+        nonempty = counts > 0
+        if nonempty.any():
+            points = self.points[self.point_index(rows)].astype(np.int64)
+            at = (np.cumsum(counts) - counts)[nonempty]
+            offsets = self.offsets[rows[nonempty]]
+            result[nonempty, :2] = np.minimum.reduceat(points, at) + offsets - LINE_MARGIN
+            result[nonempty, 2:] = np.maximum.reduceat(points, at) + offsets + LINE_MARGIN
+        return result
+
+    def cull(self, window, rows=None):
+        """包围盒与窗口(x_min, y_min, x_max, y_max)相交的行，按z序排列"""
+        if rows is None:
+            rows = self.live_rows()
+        box = self.bounds(rows)
+        x_min, y_min, x_max, y_max = window
+        hit = (box[:, 0] <= x_max) & (x_min <= box[:, 2]) & (box[:, 1] <= y_max) & (y_min <= box[:, 3])
+        return np.asarray(rows)[hit]
+
+    def nbytes(self):
+        """各数组占用的字节数（不含id字符串和字典）"""
+        return sum(a.nbytes for a in (self.types, self.algorithms, self.colors, self.offsets, self.starts,
+                                      self.counts, self.alive, self.points))
+
+    def save(self, path, coords, meta=None):
+        """保存为二进制场景文件，只保存未删除的图元，行号按z序重新编号
+
+        文件由8字节的魔数、4字节的头部长度、JSON头部和按64字节对齐的各数组组成，
+        头部记录版本、坐标约定、meta、类型名和算法名表，以及各数组的dtype、形状和在文件中的偏移
+
+        :param coords: (string) 图元使用的坐标约定，SCENE_COORDS中的一个
+        :param meta: (dict) 随场景保存的其他信息，如画布大小，须能序列化为JSON；与另一约定互相转换时需要其中的'height'
+        """
+        self._check_types(coords, path)
+        rows = self.live_rows()
+        ids = [self.ids[row] for row in rows.tolist()]
+        arrays = {
+            'types': self.types[rows],
+            'algorithms': self.algorithms[rows],
+            'colors': self.colors[rows],
+            'offsets': self.offsets[rows],
+            'counts': self.counts[rows],
+            'points': self.points[self.point_index(rows)],
+            'ids': np.frombuffer('\n'.join(ids).encode('utf-8'), np.uint8),
+        }
+        header = {
+            'version': SCENE_VERSION,
+            'coords': coords,
+            'meta': meta or {},
+            'type_names': self.type_names,
+            'algorithm_names': self.algorithm_names,
+            'arrays': {},
+        }
+        # 头部长度依赖于偏移量，先按足够大的头部长度计算偏移
+        header_size = len(json.dumps(header).encode('utf-8')) + 64 * len(arrays) + 64
+        offset = -(-(len(SCENE_MAGIC) + 4 + header_size) // SCENE_ALIGN) * SCENE_ALIGN
+        for name, array in arrays.items():
+            header['arrays'][name] = [array.dtype.str, list(array.shape), offset]
+            offset = -(-(offset + array.nbytes) // SCENE_ALIGN) * SCENE_ALIGN
+        data = json.dumps(header).encode('utf-8')
+        assert len(data) <= header_size
+        with open(path, 'wb') as fp:
+            fp.write(SCENE_MAGIC + len(data).to_bytes(4, 'little') + data)
+            for name, array in arrays.items():
+                fp.seek(header['arrays'][name][2])
+                fp.write(np.ascontiguousarray(array).tobytes())
+            fp.truncate(offset)
+
+    @classmethod
+    def load(cls, path, coords=None):
+        """打开save保存的场景文件
+
+        各数组以写时复制方式映射到内存，打开时只读取头部并计算控制点的起始位置，不复制数组；
+        之后的修改只作用于内存中的副本，不改变文件。文件的坐标约定与coords不同时转换为coords，见converted
+
+        :param coords: (string) 调用方使用的坐标约定，None表示不转换
+        :return: (SceneStore, dict) 场景和保存时的meta
+        """
+        with open(path, 'rb') as fp:
+            prefix = fp.read(len(SCENE_MAGIC) + 4)
+            if len(prefix) < len(SCENE_MAGIC) + 4 or prefix[:len(SCENE_MAGIC)] != SCENE_MAGIC:
+                raise ValueError('not a scene file: %s' % path)
+            header = json.loads(fp.read(int.from_bytes(prefix[len(SCENE_MAGIC):], 'little')).decode('utf-8'))
+        if header['version'] != SCENE_VERSION:
+            raise ValueError('unsupported scene file version %r: %s' % (header['version'], path))
+        if header.get('coords') not in SCENE_COORDS:
+            raise ValueError('scene file does not record a known coordinate convention: %s' % path)
+        arrays = {}
+        for name, (dtype, shape, offset) in header['arrays'].items():
+            if np.prod(shape) == 0:
+                arrays[name] = np.zeros(shape, dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype, 'c', offset, tuple(shape))
+        store = cls()
+        store.type_names = header['type_names']
+        store.type_codes = {name: code for code, name in enumerate(store.type_names)}
+        store.algorithm_names = header['algorithm_names']
+        store.algorithm_codes = {name: code for code, name in enumerate(store.algorithm_names)}
+        n = len(arrays['types'])
+        store.size = store.count = n
+        store.types = arrays['types']
+        store.algorithms = arrays['algorithms']
+        store.colors = arrays['colors']
+        store.offsets = arrays['offsets']
+        store.counts = arrays['counts']
+        store.starts = np.cumsum(store.counts, dtype=np.int64) - store.counts
+        store.alive = np.ones(n, bool)
+        store.points = arrays['points']
+        store.n_points = len(store.points)
+        store._ids, store._rows = [], {}
+        store._id_blob = arrays['ids'] if n else None
+        store._check_types(header['coords'], path)
+        meta = header['meta']
+        if coords is not None and coords != header['coords']:
+            if 'height' not in meta:
+                raise ValueError('scene file has no canvas height to convert coordinates: %s' % path)
+            store = store.converted(header['coords'], coords, meta['height'])
+        return store, meta
+
+    def _check_types(self, coords, path):
+        """未删除的图元类型都须属于坐标约定coords，否则抛出ValueError"""
+        if coords not in SCENE_COORDS:
+            raise ValueError('unknown coordinate convention %r' % (coords,))
+        used = {self.type_names[code] for code in np.unique(self.types[self.live_rows()]).tolist()}
+        unknown = sorted(used.difference(SCENE_COORDS[coords]))
+        if unknown:
+            raise ValueError('item types %s are not valid in %r scenes: %s' % (', '.join(unknown), coords, path))
+
+    def converted(self, src, dst, height):
+        """把场景从坐标约定src转换为dst，返回新的场景，平移量合并到控制点中，id和z序不变
+
+        y坐标按y' = height - 1 - y翻转，使同一像素在两种约定下位于图像的同一行；
+        椭圆在中心半轴与外接矩形角点之间转换，圆转换为两个半轴相等的椭圆
+
+        :param height: (int) 画布高度
+        """
+        out = SceneStore()
+        rows = self.live_rows()
+        for row, (item_type, p_list, algorithm, color) in zip(rows.tolist(), self.items(rows, offset=False)):
+            dx, dy = self.offsets[row].tolist()
+            if src == 'gui' and item_type in RADIUS_TYPES:
+                (cx, cy), (rx, ry) = p_list
+                cx, cy = cx + dx, cy + dy  # 只平移中心，半轴不变
+                if src == dst:
+                    p_list = [[cx, cy], [rx, ry]]
+                else:
+                    if item_type == 'circle':
+                        rx = ry
+                    cy = height - 1 - cy
+                    item_type, algorithm, p_list = 'ellipse', 'Midpoint', [[cx - rx, cy - ry], [cx + rx, cy + ry]]
+            elif src == dst:
+                p_list = [[x + dx, y + dy] for x, y in p_list]
+            elif src == 'cli' and item_type == 'ellipse':
+                (x0, y0), (x1, y1) = [[x + dx, y + dy] for x, y in p_list]  # 与cg_cli.ellipse_params一致
+                cx, cy, rx, ry = (x0 + x1) // 2, (y0 + y1) // 2, abs(x1 - x0) // 2, abs(y1 - y0) // 2
+                algorithm, p_list = 'Ellipse', [[cx, height - 1 - cy], [rx, ry]]
+            else:
+                p_list = [[x + dx, height - 1 - (y + dy)] for x, y in p_list]
+            out.put(self.ids[row], item_type, p_list, algorithm, color)
+        return out
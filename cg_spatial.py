@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 图元包围盒的均匀网格空间索引，供画布点选和框选使用，不依赖Qt
+
+
+class GridIndex:
+    """均匀网格空间索引
+
+    每个图元按包围盒登记到其覆盖的所有网格中，点查询只检查一个网格，区域查询只检查区域覆盖的网格，
+    查询代价与网格内的图元数量相关而与图元总数无关
+    """
+    def __init__(self, cell_size: int = 64):
+        """
+        :param cell_size: (int) 网格边长（像素）
+        """
+        self.cell_size = cell_size
+        self.cells = {}   # (cx, cy) -> 该网格内的图元id集合
+        self.rects = {}   # 图元id -> 包围盒(x_min, y_min, x_max, y_max)
+        self.order = {}   # 图元id -> 插入序号，越大越靠上层
+        self.count = 0
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __contains__(self, key):
+        return key in self.rects
+
+    def _cell_range(self, rect):
+        s = self.cell_size
+        x_min, y_min, x_max, y_max = rect
+        return range(int(x_min // s), int(x_max // s) + 1), range(int(y_min // s), int(y_max // s) + 1)
+
+    def insert(self, key, rect):
+        """登记图元的包围盒，已存在的图元视为更新（保持其层次顺序不变）
+
+        :param key: 图元id
+        :param rect: (tuple of number: (x_min, y_min, x_max, y_max)) 包围盒
+        """
+        if key in self.rects:
+            if self.rects[key] == rect:
+                return
+            self._unlink(key)
+        else:
+            self.count += 1
+            self.order[key] = self.count
+        self.rects[key] = rect
+        xs, ys = self._cell_range(rect)
+        for cx in xs:
+            for cy in ys:
+                self.cells.setdefault((cx, cy), set()).add(key)
+
+    update = insert
+
+    def remove(self, key):
+        if key in self.rects:
+            self._unlink(key)
+            del self.rects[key]
+            del self.order[key]
+
+    def _unlink(self, key):
+        xs, ys = self._cell_range(self.rects[key])
+        for cx in xs:
+            for cy in ys:
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    cell.discard(key)
+                    if not cell:
+                        del self.cells[(cx, cy)]
+
+    def clear(self):
+        self.cells.clear()
+        self.rects.clear()
+        self.order.clear()
+        self.count = 0
+
+    def query_point(self, x, y):
+        """返回包围盒包含点(x, y)的图元id列表，按层次从下到上排列"""
+        s = self.cell_size
+        result = []
+        for key in self.cells.get((int(x // s), int(y // s)), ()):
+            x_min, y_min, x_max, y_max = self.rects[key]
+            if x_min <= x <= x_max and y_min <= y <= y_max:
+                result.append(key)
+        result.sort(key=self.order.__getitem__)
+        return result
+
+    def query_rect(self, rect, contain: bool = False):
+        """区域查询
+
+        :param rect: (tuple of number: (x_min, y_min, x_max, y_max)) 查询区域
+        :param contain: (bool) 为True时只返回包围盒完全位于区域内的图元，否则返回与区域相交的图元
+        :return: (list) 图元id列表，按层次从下到上排列
+        """
+        q_x_min, q_y_min, q_x_max, q_y_max = rect
+        xs, ys = self._cell_range(rect)
+        if len(xs) * len(ys) > len(self.cells):  # 区域覆盖的网格比非空网格还多时直接遍历非空网格
+            candidates = set().union(*self.cells.values()) if self.cells else set()
+        else:
+            candidates = set()
+            for cx in xs:
+                for cy in ys:
+                    cell = self.cells.get((cx, cy))
+                    if cell:
+                        candidates |= cell
+        result = []
+        for key in candidates:
+            x_min, y_min, x_max, y_max = self.rects[key]
+            if contain:
+                hit = q_x_min <= x_min and x_max <= q_x_max and q_y_min <= y_min and y_max <= q_y_max
+            else:
+                hit = x_min <= q_x_max and q_x_min <= x_max and y_min <= q_y_max and q_y_min <= y_max
+            if hit:
+                result.append(key)
+        result.sort(key=self.order.__getitem__)
+        return result
@@ -0,0 +1,118 @@
+# -*- coding:utf-8 -*-
+# cg_algorithms_np与cg_algorithms的结果须完全一致，包括像素顺序
+import random
+import numpy as np
+import pytest
+import cg_algorithms as alg
+import cg_algorithms_np as alg_np
+
+LINE_ALGORITHMS = ('Naive', 'DDA', 'Bresenham')
+POLYGON_ALGORITHMS = ('DDA', 'Bresenham', 'Scanline')
+WINDOW = (20, 30, 180, 150)
+
+
+def same(expected, actual):
+    return np.array_equal(np.asarray(expected, dtype=np.int64).reshape(-1, 2), np.asarray(actual).reshape(-1, 2))
+
+
+def random_points(rng, n, low=-60, high=260):
+    return [[rng.randint(low, high), rng.randint(low, high)] for _ in range(n)]
+
+
+@pytest.mark.parametrize('algorithm', LINE_ALGORITHMS)
+def test_draw_line(algorithm):
+    rng = random.Random(1)
+    segments = [random_points(rng, 2) for _ in range(300)]
+    # 水平、竖直、对角线和退化为一点的线段
+    segments += [[[0, 5], [40, 5]], [[7, 0], [7, -30]], [[0, 0], [25, 25]], [[3, 3], [3, 3]]]
+    for p_list in segments:
+        assert same(alg.draw_line(p_list, algorithm), alg_np.draw_line(p_list, algorithm)), p_list
+
+
+@pytest.mark.parametrize('algorithm', LINE_ALGORITHMS)
+@pytest.mark.parametrize('window', (None, WINDOW))
+def test_draw_lines(algorithm, window):
+    rng = random.Random(2)
+    segments = [random_points(rng, 2) for _ in range(300)]
+    pixels, offsets = alg.draw_lines(segments, algorithm, window)
+    pixels_np, offsets_np = alg_np.draw_lines(segments, algorithm, window)
+    assert same(pixels, pixels_np)
+    assert list(offsets) == offsets_np.tolist()
+
+
+@pytest.mark.parametrize('algorithm', LINE_ALGORITHMS)
+def test_draw_lines_window_matches_crop(algorithm):
+    # 指定窗口时的结果须与完整绘制后去掉窗口外像素相同，包括超出端点包围盒的像素
+    rng = random.Random(9)
+    segments = [random_points(rng, 2) for _ in range(300)] + [[[148, -33], [50, 174]]]
+    window = (0, 150, 49, 199)
+    for p_list in segments:
+        expected = alg.crop(alg.draw_line(p_list, algorithm), window)
+        assert same(expected, alg.draw_lines([p_list], algorithm, window)[0]), p_list
+        assert same(expected, alg_np.draw_lines([p_list], algorithm, window)[0]), p_list
+
+
+@pytest.mark.parametrize('algorithm', POLYGON_ALGORITHMS)
+@pytest.mark.parametrize('window', (None, WINDOW))
+def test_draw_polygon(algorithm, window):
+    rng = random.Random(3)
+    for _ in range(60):
+        p_list = random_points(rng, rng.randint(3, 8))
+        p_list.append(p_list[0])
+        assert same(alg.draw_polygon(p_list, algorithm, window), alg_np.draw_polygon(p_list, algorithm, window))
+
+
+def test_draw_circle():
+    for r in list(range(0, 40)) + [255, 1000]:
+        p_list = [[17, -4], [0, r]]
+        assert same(alg.draw_circle(p_list, 'Midpoint'), alg_np.draw_circle(p_list, 'Midpoint')), r
+
+
+def test_draw_ellipse():
+    rng = random.Random(4)
+    radii = [(a, b) for a in range(0, 12) for b in range(0, 12)]
+    radii += [(rng.randint(0, 400), rng.randint(0, 400)) for _ in range(40)]
+    for a, b in radii:
+        p_list = [[-3, 11], [a, b]]
+        assert same(alg.draw_ellipse(p_list), alg_np.draw_ellipse(p_list)), (a, b)
+
+
+def test_draw_ellipse_overflow():
+    # 判别式超出int64时NumPy后端改用逐点计算，结果仍须一致且能结束
+    p_list = [[0, 0], [40000, 30000]]
+    assert same(alg.draw_ellipse(p_list), alg_np.draw_ellipse(p_list))
+
+
+@pytest.mark.parametrize('algorithm', ('Bezier', 'B-spline'))
+def test_draw_curve(algorithm):
+    rng = random.Random(5)
+    for n in (2, 3, 4, 7):
+        p_list = random_points(rng, n)
+        assert same(alg.draw_curve(p_list, algorithm), alg_np.draw_curve(p_list, algorithm))
+
+
+def test_transform_items():
+    rng = random.Random(8)
+    p_lists = [random_points(rng, rng.randint(2, 6)) for _ in range(100)]
+    matrices = []
+    for _ in p_lists:
+        m = alg.compose(alg.rotate_matrix(rng.randint(0, 200), rng.randint(0, 200), rng.randint(-180, 180)),
+                        alg.scale_matrix(rng.randint(0, 200), rng.randint(0, 200), rng.uniform(0.3, 2)))
+        matrices.append(alg.compose(alg.translate_matrix(rng.randint(-50, 50), rng.randint(-50, 50)), m))
+    assert alg.transform_items(p_lists, matrices) == alg_np.transform_items(p_lists, matrices)
+
+
+@pytest.mark.parametrize('algorithm', ('Cohen-Sutherland', 'Liang-Barsky'))
+def test_clip_lines(algorithm):
+    rng = random.Random(7)
+    segments = [random_points(rng, 2) for _ in range(500)]
+    result, keep = alg.clip_lines(segments, *WINDOW, algorithm)
+    result_np, keep_np = alg_np.clip_lines(segments, *WINDOW, algorithm)
+    assert keep == keep_np.tolist()
+    assert np.array_equal(np.array(result), result_np)
+
+
+def test_crop():
+    rng = random.Random(6)
+    pixels = random_points(rng, 500)
+    assert same(alg.crop(pixels, WINDOW), alg_np.crop(np.array(pixels, np.int32), WINDOW))
@@ -0,0 +1,15 @@
+# -*- coding:utf-8 -*-
+import json
+import pytest
+import cg_bench
+
+
+def test_baseline_backend_must_match(tmp_path, capsys):
+    baseline = str(tmp_path / 'baseline.json')
+    assert cg_bench.main(['-k', 'draw_circle/r=4', '--repeat', '1', '-o', baseline]) == 0
+    assert json.load(open(baseline))['backend'] == 'python'
+    with pytest.raises(SystemExit) as e:
+        cg_bench.main(['-k', 'draw_circle/r=4', '--repeat', '1', '--backend', 'numpy', '--baseline', baseline])
+    assert e.value.code == 2
+    assert "'python'" in capsys.readouterr().err  # 错误信息中给出两个后端
+    assert cg_bench.main(['-k', 'draw_circle/r=4', '--repeat', '1', '--baseline', baseline, '--threshold', '1000']) == 0
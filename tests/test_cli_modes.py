@@ -0,0 +1,94 @@
+# -*- coding:utf-8 -*-
+# cg_cli的各种绘制方式输出的图像须逐字节相同
+import os
+import random
+import pytest
+import cg_cli
+
+MODES = {
+    'full-redraw': ['--full-redraw'],
+    'numpy': ['--backend', 'numpy'],
+    'jobs': ['--jobs', '2'],
+    'mmap': ['--mmap'],
+    'tile': ['--tile', '64'],
+    'tile-numpy': ['--tile', '50', '--backend', 'numpy'],
+    'tile-jobs': ['--tile', '64', '--jobs', '2'],
+    'no-cache': ['--cache-pixels', '0'],
+    'small-cache': ['--cache-pixels', '3000', '--backend', 'numpy'],
+}
+
+
+def random_script(seed, width=300, height=240, commands=250):
+    """随机生成命令文件：部分图元超出画布，并对已有图元做平移、旋转、缩放和裁剪"""
+    rng = random.Random(seed)
+    lines = ['resetCanvas %d %d' % (width, height)]
+    ids = []
+
+    def points(n):
+        return ' '.join('%d %d' % (rng.randint(-50, width + 50), rng.randint(-50, height + 50)) for _ in range(n))
+
+    for i in range(commands):
+        k = rng.random()
+        if k < 0.1:
+            lines.append('setColor %d %d %d' % (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        elif k < 0.3:
+            item_id = rng.choice(ids) if ids and rng.random() < 0.2 else 'l%d' % i  # 部分重用已有的id
+            lines.append('drawLine %s %s %s' % (item_id, points(2), rng.choice(['DDA', 'Bresenham'])))
+            ids.append(item_id)
+        elif k < 0.4:
+            ids.append('p%d' % i)
+            lines.append('drawPolygon %s %s %s' % (ids[-1], points(rng.randint(3, 6)),
+                                                    rng.choice(['DDA', 'Bresenham', 'Scanline'])))
+        elif k < 0.5:
+            ids.append('e%d' % i)
+            lines.append('drawEllipse %s %s' % (ids[-1], points(2)))
+        elif k < 0.55:
+            ids.append('c%d' % i)
+            lines.append('drawCurve %s %s %s' % (ids[-1], points(rng.randint(3, 6)), rng.choice(['Bezier', 'B-spline'])))
+        elif k < 0.85 and ids:
+            item_id = rng.choice(ids)
+            t = rng.randrange(4)
+            if t == 0:
+                lines.append('translate %s %d %d' % (item_id, rng.randint(-30, 30), rng.randint(-30, 30)))
+            elif t == 1:
+                lines.append('rotate %s %d %d %d' % (item_id, rng.randint(0, width), rng.randint(0, height),
+                                                     rng.randint(-180, 180)))
+            elif t == 2:
+                lines.append('scale %s %d %d %.2f' % (item_id, rng.randint(0, width), rng.randint(0, height),
+                                                      rng.uniform(0.5, 1.5)))
+            elif item_id.startswith('l'):
+                lines.append('clip %s %d %d %d %d %s' % (item_id, rng.randint(0, 100), rng.randint(0, 100),
+                                                         rng.randint(150, width), rng.randint(120, height),
+                                                         rng.choice(['Cohen-Sutherland', 'Liang-Barsky'])))
+                ids = [j for j in ids if j != item_id]
+        elif rng.random() < 0.3:
+            lines.append('saveCanvas f%d' % i)
+    lines.append('saveCanvas last')
+    return '\n'.join(lines) + '\n'
+
+
+def render(tmp_path, script, tag, options):
+    output_dir = str(tmp_path / tag)
+    cg_cli.main([script, output_dir] + options)
+    return {name: open(os.path.join(output_dir, name), 'rb').read() for name in sorted(os.listdir(output_dir))}
+
+
+@pytest.mark.parametrize('seed', (0, 1))
+def test_modes_match(tmp_path, seed):
+    script = str(tmp_path / 'input.txt')
+    with open(script, 'w') as fp:
+        fp.write(random_script(seed))
+    expected = render(tmp_path, script, 'incremental', [])
+    assert len(expected) > 1
+    for tag, options in MODES.items():
+        assert render(tmp_path, script, tag, options) == expected, tag
+
+
+def test_scene_round_trip(tmp_path):
+    script = str(tmp_path / 'input.txt')
+    with open(script, 'w') as fp:
+        fp.write(random_script(2) + 'saveScene s\n')
+    expected = render(tmp_path, script, 'a', [])
+    with open(script, 'w') as fp:
+        fp.write('loadScene %s\nsaveCanvas last\n' % (tmp_path / 'a' / 's.cgs'))
+    assert render(tmp_path, script, 'b', [])['last.bmp'] == expected['last.bmp']
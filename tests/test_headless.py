@@ -0,0 +1,169 @@
+# -*- coding:utf-8 -*-
+# cg_headless.render_scene须与图形界面中QGraphicsScene.render的结果逐像素相同
+import os
+import random
+import numpy as np
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PyQt5.QtWidgets')
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtCore import QPoint, Qt, QRectF
+from PyQt5.QtTest import QTest
+import cg_gui
+import cg_headless
+import cg_algorithms
+import cg_algorithms_np
+from cg_scene import SceneStore
+
+SIZE = 600
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def window(app):
+    main_window = cg_gui.MainWindow()
+    main_window.show()
+    QTest.qWaitForWindowExposed(main_window)
+    yield app, main_window
+    main_window.close()
+
+
+def draw_random_scene(app, main_window, seed, count=25):
+    """用鼠标事件随机绘制各类图元，并把部分图元平移到场景外"""
+    canvas = main_window.canvas_widget
+    viewport = canvas.viewport()
+    rng = random.Random(seed)
+
+    def click(x, y, button=Qt.LeftButton):
+        QTest.mouseClick(viewport, button, pos=QPoint(x, y))
+
+    def point():
+        return rng.randint(0, SIZE - 10), rng.randint(0, SIZE - 10)
+
+    actions = [main_window.line_dda_action, main_window.line_bresenham_action, main_window.line_naive_action,
+               main_window.polygon_dda_action, main_window.polygon_bresenham_action,
+               main_window.polygon_scanline_action, main_window.circle_action, main_window.ellipse_action,
+               main_window.curve_bezier_action, main_window.curve_b_spline_action]
+    for _ in range(count):
+        canvas.set_my_color(rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        rng.choice(actions)()
+        if canvas.status in ('line', 'circle', 'ellipse'):
+            p, q = point(), point()
+            click(*p)
+            QTest.mouseMove(viewport, QPoint(*q))
+            click(*q)
+        elif canvas.status == 'polygon':
+            points = [point() for _ in range(rng.randint(3, 5))]
+            for p in points:
+                click(*p)
+            click(points[0][0] + 1, points[0][1] + 1)  # 点击起点附近闭合多边形
+        else:
+            for _ in range(rng.randint(3, 5)):
+                click(*point())
+            click(*point(), Qt.RightButton)
+        app.processEvents()
+    for item_id in list(canvas.item_dict)[:8]:
+        item = canvas.item_dict[item_id]
+        item.offset[0] += rng.randint(-200, 200)
+        item.offset[1] += rng.randint(-200, 200)
+    canvas.clear_selection()
+    canvas.scene().update()
+    app.processEvents()
+    return canvas
+
+
+def qt_render(canvas):
+    image = QImage(SIZE, SIZE, QImage.Format_RGB32)
+    image.fill(Qt.white)
+    painter = QPainter(image)
+    canvas.scene().render(painter, QRectF(0, 0, SIZE, SIZE), QRectF(0, 0, SIZE, SIZE))
+    painter.end()
+    bits = image.constBits()
+    bits.setsize(image.byteCount())
+    return np.frombuffer(bytes(bits), np.uint8).reshape(SIZE, SIZE, 4)[..., [2, 1, 0]]
+
+
+@pytest.mark.parametrize('backend', (cg_algorithms, cg_algorithms_np))
+@pytest.mark.parametrize('render_mode', ('image', 'point'))
+def test_render_scene_matches_qt(window, backend, render_mode, monkeypatch):
+    app, main_window = window
+    canvas = draw_random_scene(app, main_window, seed=0)
+    assert len(canvas.store) > 0
+    monkeypatch.setattr(cg_gui.MyItem, 'backend', backend)
+    monkeypatch.setattr(cg_gui.MyItem, 'render_mode', render_mode)
+    expected = qt_render(canvas)
+    actual = cg_headless.render_scene(canvas.store, SIZE, SIZE, backend)
+    assert (expected != 255).any()
+    assert np.array_equal(actual, expected)
+
+
+def cli_geometry(item_type, p_list, offset, height):
+    """按命令行的坐标约定（y轴向上，椭圆为外接矩形的角点）写出图形界面图元平移后的控制点"""
+    dx, dy = offset
+    if item_type in ('circle', 'ellipse'):
+        (cx, cy), (rx, ry) = p_list
+        if item_type == 'circle':
+            rx = ry
+        cx, cy = cx + dx, height - 1 - (cy + dy)
+        return 'ellipse', [[cx - rx, cy - ry], [cx + rx, cy + ry]]
+    return item_type, [[x + dx, height - 1 - (y + dy)] for x, y in p_list]
+
+
+def test_scene_file_round_trip(window, tmp_path):
+    app, main_window = window
+    canvas = draw_random_scene(app, main_window, seed=1)
+    viewport = canvas.viewport()
+    for action, (p, q), offset in ((main_window.circle_action, ((200, 200), (230, 240)), (30, 40)),
+                                   (main_window.ellipse_action, ((300, 350), (360, 370)), (5, 50))):
+        action()
+        QTest.mouseClick(viewport, Qt.LeftButton, pos=QPoint(*p))
+        QTest.mouseMove(viewport, QPoint(*q))
+        QTest.mouseClick(viewport, Qt.LeftButton, pos=QPoint(*q))
+        item = canvas.item_dict[canvas.store.ids[canvas.store.size - 1]]
+        item.offset[0] += offset[0]
+        item.offset[1] += offset[1]
+    canvas.scene().update()
+    app.processEvents()
+    path = str(tmp_path / 'scene.cgs')
+    canvas.store.save(path, 'gui', {'width': SIZE, 'height': SIZE})
+    store, meta = SceneStore.load(path, 'gui')
+    assert np.array_equal(cg_headless.render_scene(store, SIZE, SIZE), qt_render(canvas))
+    # 命令行按自己的坐标约定读取：平移量并入控制点（圆和椭圆只平移中心），y轴翻转，圆和椭圆转换为外接矩形的角点
+    cli_store, _ = SceneStore.load(path, 'cli')
+    assert len(cli_store) == len(canvas.item_dict)
+    translated = {'circle': 0, 'ellipse': 0}
+    for item_id, item in canvas.item_dict.items():
+        offset = [int(v) for v in item.offset]
+        if item.item_type in translated and any(offset):
+            translated[item.item_type] += 1
+        expected_type, expected = cli_geometry(item.item_type, item.p_list, offset, SIZE)
+        assert cli_store.item_type(item_id) == expected_type, item_id
+        assert cli_store.p_list(item_id) == expected, item_id
+    assert translated['circle'] and translated['ellipse']
+
+
+def test_sparse_items_cache_runs_not_images(window):
+    app, main_window = window
+    canvas = main_window.canvas_widget
+    viewport = canvas.viewport()
+    main_window.line_bresenham_action()
+    QTest.mouseClick(viewport, Qt.LeftButton, pos=QPoint(5, 5))
+    QTest.mouseMove(viewport, QPoint(590, 590))
+    QTest.mouseClick(viewport, Qt.LeftButton, pos=QPoint(590, 590))
+    main_window.polygon_scanline_action()
+    for p in ((100, 100), (300, 100), (300, 300), (100, 300), (101, 101)):
+        QTest.mouseClick(viewport, Qt.LeftButton, pos=QPoint(*p))
+    app.processEvents()
+    line, polygon = (canvas.item_dict[canvas.store.ids[row]] for row in canvas.store.live_rows().tolist())
+    # 长斜线的包围盒几乎全空，缓存水平像素段，占用与像素数成正比；填充多边形仍缓存整幅图像
+    runs = line.render_image()
+    assert isinstance(runs, list) and len(runs) <= 2 * len(line.rasterize())
+    assert not isinstance(polygon.render_image(), list)
+    expected = qt_render(canvas)
+    assert np.array_equal(cg_headless.render_scene(canvas.store, SIZE, SIZE), expected)